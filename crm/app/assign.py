@@ -0,0 +1,157 @@
+# app/assign.py
+import asyncio
+import logging
+from typing import Any, Dict
+
+from app.config import (
+    ASSIGN_LLM_CONCURRENCY,
+    ASSIGN_TASK_CONCURRENCY,
+    ASSIGN_PIPELINE_BUFFER,
+)
+from app.crm import (
+    get_workspace_members,
+    MemberLoadLedger,
+    create_task_for_person,
+)
+from app.llm import generate_sales_followup_markdown
+from app.metrics import ASSIGN_QUEUE_DEPTH
+from app.mirror import (
+    get_open_task_counts,
+    iter_people_without_open_tasks,
+    record_created_task,
+    refresh_mirror,
+)
+from app.profiling import span
+
+logger = logging.getLogger("app.assign")
+
+_DONE = object()
+
+# (stage name, queue) of every pipeline currently running, for /metrics.
+_active_queues = []
+
+
+def _queue_depths():
+    depths = {("people",): 0, ("notes",): 0}
+    for name, queue in _active_queues:
+        depths[(name,)] += queue.qsize()
+    return depths
+
+
+ASSIGN_QUEUE_DEPTH.set_function(_queue_depths)
+
+
+# -------------------------------------------------
+# AUTO-ASSIGN PIPELINE
+#
+#   people ──▶ [LLM stage] ──notes──▶ [task stage] ──▶ Twenty
+#
+# Notes are generated ahead of time by a bounded pool while a separate
+# pool posts tasks as soon as each note is ready, so the run takes about
+# as long as the slower stage rather than the sum of both.
+#
+# People and open-task counts come from the local Twenty mirror
+# (app/mirror.py), brought up to date by one incremental poll first.
+# -------------------------------------------------
+async def auto_assign(
+    pool,
+    llm_concurrency: int = ASSIGN_LLM_CONCURRENCY,
+    task_concurrency: int = ASSIGN_TASK_CONCURRENCY,
+    buffer: int = ASSIGN_PIPELINE_BUFFER,
+) -> Dict[str, Any]:
+    with span("mirror refresh"):
+        await refresh_mirror(pool)
+    with span("workspace members"):
+        members = await get_workspace_members()
+    ledger = MemberLoadLedger(
+        members, await get_open_task_counts(pool, [m["id"] for m in members])
+    )
+
+    llm_concurrency = max(1, llm_concurrency)
+    task_concurrency = max(1, task_concurrency)
+
+    people_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer))
+    notes_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer))
+    created, failed = [], []
+    tracked = [("people", people_q), ("notes", notes_q)]
+    _active_queues.extend(tracked)
+
+    async def produce():
+        async for person in iter_people_without_open_tasks(pool):
+            await people_q.put(person)
+        for _ in range(llm_concurrency):
+            await people_q.put(_DONE)
+
+    async def generate():
+        while (person := await people_q.get()) is not _DONE:
+            # LLM failures fall back to the static template; anything else
+            # (a malformed person) fails that person only, not the run.
+            try:
+                with span("assign note", person_id=person.get("id")):
+                    note = await generate_sales_followup_markdown(person)
+            except Exception as e:
+                await notes_q.put((person, None, e))
+                continue
+            await notes_q.put((person, note, None))
+
+    async def generate_all():
+        await asyncio.gather(*(generate() for _ in range(llm_concurrency)))
+        for _ in range(task_concurrency):
+            await notes_q.put(_DONE)
+
+    async def post():
+        while (item := await notes_q.get()) is not _DONE:
+            person, note, error = item
+            if error is not None:
+                failed.append({
+                    "customer": person.get("name"),
+                    "error": str(error),
+                })
+                continue
+
+            assignee = ledger.reserve()
+
+            try:
+                with span("assign task", person_id=person.get("id"), member_id=assignee["id"]):
+                    task, target = await create_task_for_person(person, assignee["id"], note)
+                created.append({
+                    "task_id": task["id"],
+                    "customer": f"{person['name']['firstName']} {person['name']['lastName']}",
+                    "assigned_to": assignee["userEmail"],
+                })
+            except Exception as e:
+                ledger.release(assignee["id"])
+                failed.append({
+                    "customer": person["name"],
+                    "error": str(e),
+                })
+                continue
+
+            try:
+                await record_created_task(pool, task, target)
+            except Exception:
+                # The next mirror poll picks the task up anyway.
+                logger.exception("could not write task %s through to the mirror", task["id"])
+
+    stages = [
+        asyncio.ensure_future(produce()),
+        asyncio.ensure_future(generate_all()),
+        *(asyncio.ensure_future(post()) for _ in range(task_concurrency)),
+    ]
+    try:
+        await asyncio.gather(*stages)
+    except BaseException:
+        # e.g. Twenty listing failed: stop the other stages, which would
+        # otherwise wait forever on their queues.
+        for stage in stages:
+            stage.cancel()
+        raise
+    finally:
+        for item in tracked:
+            _active_queues.remove(item)
+
+    return {
+        "tasks_created": len(created),
+        "tasks_failed": len(failed),
+        "details": created + failed,
+    }
@@ -0,0 +1,137 @@
+# app/bulk.py
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.config import BULK_CHUNK_SIZE
+from app.models import bulk_create_leads, bulk_record
+from app.schemas import LeadCreate
+
+NDJSON = "ndjson"
+CSV = "csv"
+
+
+# -------------------------------------------------
+# STREAM → RECORDS
+# -------------------------------------------------
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines (newline kept), chunk by chunk."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _iter_ndjson(stream) -> AsyncIterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    async for line in _iter_lines(stream):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(value, dict):
+            yield None, "Each line must be a JSON object"
+            continue
+        yield value, None
+
+
+async def _iter_csv_records(stream) -> AsyncIterator[str]:
+    # A record is complete once its quotes balance, so quoted fields may
+    # contain newlines ("" escapes keep the count even).
+    record = ""
+    async for line in _iter_lines(stream):
+        record += line
+        if record.count('"') % 2 == 0:
+            yield record
+            record = ""
+    if record:
+        yield record
+
+
+async def _iter_csv(stream) -> AsyncIterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    header: Optional[List[str]] = None
+    async for record in _iter_csv_records(stream):
+        if not record.strip():
+            continue
+        try:
+            fields = next(csv.reader([record]))
+        except (csv.Error, StopIteration) as e:
+            yield None, f"Invalid CSV: {e}"
+            continue
+
+        if header is None:
+            header = [h.strip() for h in fields]
+            continue
+        if len(fields) != len(header):
+            yield None, f"Expected {len(header)} fields, got {len(fields)}"
+            continue
+
+        # Empty cells mean "not provided", like a missing JSON key.
+        yield {k: v for k, v in zip(header, fields) if v != ""}, None
+
+
+# -------------------------------------------------
+# BULK INGEST
+# -------------------------------------------------
+async def ingest_leads(
+    conn,
+    stream: AsyncIterator[bytes],
+    fmt: str,
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Validate each row against `LeadCreate` and load valid rows
+    `chunk_size` at a time (COPY + one set-based dedup/insert per chunk).
+
+    Rows are numbered from 1 in input order (CSV header excluded); every
+    row gets exactly one result: created, existing or rejected.
+    """
+    rows = _iter_csv(stream) if fmt == CSV else _iter_ndjson(stream)
+    results: List[Dict[str, Any]] = []
+    counts = {"created": 0, "existing": 0, "rejected": 0}
+    pending: List[tuple] = []
+
+    async def flush():
+        for row_no, status, lead_id in await bulk_create_leads(conn, pending):
+            counts[status] += 1
+            results.append({"row": row_no, "status": status, "lead_id": lead_id})
+        pending.clear()
+
+    row_no = 0
+    async for raw, error in rows:
+        row_no += 1
+        if error is None:
+            try:
+                pending.append(bulk_record(row_no, LeadCreate(**raw)))
+            except (ValidationError, TypeError) as e:
+                error = str(e)
+
+        if error is not None:
+            counts["rejected"] += 1
+            results.append({"row": row_no, "status": "rejected", "error": error})
+
+        if len(pending) >= chunk_size:
+            await flush()
+
+    await flush()
+    results.sort(key=lambda r: r["row"])
+
+    return {
+        "total": row_no,
+        "created_count": counts["created"],
+        "existing_count": counts["existing"],
+        "rejected_count": counts["rejected"],
+        "results": results,
+    }
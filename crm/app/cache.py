@@ -0,0 +1,252 @@
+# app/cache.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from app.config import (
+    LEAD_CACHE_LISTEN_CHECK_SECONDS,
+    LEAD_CACHE_MAX_ENTRIES,
+    LEAD_CACHE_TTL_SECONDS,
+    TWENTY_REF_CACHE_TTL_SECONDS,
+    TWENTY_REF_CACHE_MAX_STALE_SECONDS,
+)
+from app.db import get_db_connection
+
+logger = logging.getLogger("app.cache")
+
+MISS = object()
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU whose entries also expire after `ttl` seconds.
+
+    `None` is a legitimate cached value (e.g. "no such lead"), so `get`
+    returns `MISS` when nothing usable is cached.
+
+    Read-through callers take `generation()` before reading the source and
+    pass it to `set`; if the key was invalidated in between, the value they
+    read may predate the write and is not cached.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        # key -> generation of its last invalidation, bounded like _data;
+        # anything older than _forgotten may have been dropped from it.
+        self._generation = 0
+        self._invalidated: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._forgotten = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "evictions": 0,
+            "stale_sets_skipped": 0,
+        }
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+            del self._data[key]
+
+        self.stats["misses"] += 1
+        return MISS
+
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        if generation is not None and (
+            generation < self._forgotten or self._invalidated.get(key, 0) > generation
+        ):
+            self.stats["stale_sets_skipped"] += 1
+            return
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        for key in keys:
+            self._generation += 1
+            self._invalidated[key] = self._generation
+            self._invalidated.move_to_end(key)
+            if self._data.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+        while len(self._invalidated) > self.max_entries:
+            _, self._forgotten = self._invalidated.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self._generation += 1
+        self._invalidated.clear()
+        self._forgotten = self._generation
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+        }
+
+
+# -------------------------------------------------
+# GET /leads/{lead_id} read-through cache
+# -------------------------------------------------
+# Writers NOTIFY this channel with the lead_id when LEAD_CACHE_NOTIFY is
+# on, so every API worker drops its copy (see main.lifespan).
+LEAD_CACHE_CHANNEL = "lead_cache_invalidate"
+
+lead_cache = TTLCache(LEAD_CACHE_MAX_ENTRIES, LEAD_CACHE_TTL_SECONDS)
+
+
+def on_lead_cache_notify(connection, pid, channel, payload):
+    """asyncpg listener callback for LEAD_CACHE_CHANNEL."""
+    lead_cache.invalidate([payload])
+
+
+async def listen_lead_cache(stop: asyncio.Event, interval: float = LEAD_CACHE_LISTEN_CHECK_SECONDS):
+    """
+    Keep a LISTEN connection on LEAD_CACHE_CHANNEL until `stop` is set,
+    reconnecting when it drops. Invalidations sent while nobody listened
+    are lost, so every (re)connect also drops the whole cache.
+    """
+    listener = None
+    try:
+        while not stop.is_set():
+            if listener is None or listener.is_closed():
+                try:
+                    listener = await get_db_connection()
+                    await listener.add_listener(LEAD_CACHE_CHANNEL, on_lead_cache_notify)
+                    lead_cache.clear()
+                except Exception:
+                    logger.exception("could not LISTEN on %s; retrying", LEAD_CACHE_CHANNEL)
+                    if listener is not None and not listener.is_closed():
+                        listener.terminate()
+                    listener = None
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if listener is not None and not listener.is_closed():
+            await listener.close()
+
+
+# -------------------------------------------------
+# Twenty reference data (workspace members, lookups)
+# -------------------------------------------------
+class RefreshingCache:
+    """
+    Async cache for slow-changing data loaded from an external API.
+
+    - fresh (younger than `ttl`): served from memory;
+    - stale (up to `max_stale` past expiry): served from memory while one
+      background refresh runs;
+    - missing or older: callers wait for a refresh.
+
+    Refreshes are single-flight per key: concurrent callers share one
+    in-flight load instead of each hitting the API. If a refresh fails and
+    a stale value is still within `max_stale`, that value keeps being served.
+    """
+
+    def __init__(self, ttl: float, max_stale: float):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        # key -> (value, fresh_until, stale_until)
+        self._data: Dict[Hashable, tuple[Any, float, float]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "coalesced": 0,
+        }
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        now = time.monotonic()
+        entry = self._data.get(key)
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self.stats["hits"] += 1
+                return value
+            if now < stale_until:
+                self.stats["stale_hits"] += 1
+                self._refresh(key, loader, ttl)
+                return value
+
+        self.stats["misses"] += 1
+        # shield: a cancelled caller must not cancel the shared load.
+        return await asyncio.shield(self._refresh(key, loader, ttl))
+
+    def _refresh(self, key, loader, ttl: Optional[float]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return task
+
+        async def load():
+            self.stats["refreshes"] += 1
+            try:
+                value = await loader()
+            except Exception:
+                self.stats["refresh_errors"] += 1
+                entry = self._data.get(key)
+                if entry is not None and time.monotonic() < entry[2]:
+                    logger.warning("refresh of %r failed; serving stale value", key, exc_info=True)
+                    return entry[0]
+                raise
+            finally:
+                self._inflight.pop(key, None)
+
+            fresh_until = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._data[key] = (value, fresh_until, fresh_until + self.max_stale)
+            return value
+
+        task = asyncio.ensure_future(load())
+        # Background refreshes may never be awaited; keep their errors quiet.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return task
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            **self.stats,
+            "fresh_for_seconds": {
+                str(k): round(fresh_until - now, 1) for k, (_, fresh_until, _) in self._data.items()
+            },
+            "refreshing": [str(k) for k in self._inflight],
+            "ttl_seconds": self.ttl,
+            "max_stale_seconds": self.max_stale,
+        }
+
+
+reference_cache = RefreshingCache(TWENTY_REF_CACHE_TTL_SECONDS, TWENTY_REF_CACHE_MAX_STALE_SECONDS)
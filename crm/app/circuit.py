@@ -0,0 +1,144 @@
+# app/circuit.py
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one downstream dependency.
+
+    closed     calls go through; `failure_threshold` failures in a row
+               (errors, or calls slower than `slow_call_seconds`) open it.
+    open       calls are refused for `open_seconds`, so callers can take
+               their fallback immediately instead of waiting on a timeout.
+    half_open  up to `half_open_max_calls` probes go through; a success
+               closes the circuit, a failure opens it again.
+
+    Single event loop only; no locking needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        open_seconds: float,
+        slow_call_seconds: float,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probes_in_flight = 0
+
+        self.stats = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "times_opened": 0,
+        }
+        self.last_latency: Optional[float] = None
+        self.avg_latency: Optional[float] = None
+
+    # ---------------------------------------------
+    # gate
+    # ---------------------------------------------
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.stats["rejected"] += 1
+                return False
+            self.state = HALF_OPEN
+            self.opened_at = time.monotonic()
+            self._probes_in_flight = 0
+
+        if self.state == HALF_OPEN:
+            # A probe that never reported back (e.g. cancelled) must not
+            # wedge the breaker half-open forever.
+            if time.monotonic() - self.opened_at >= self.open_seconds:
+                self.opened_at = time.monotonic()
+                self._probes_in_flight = 0
+            if self._probes_in_flight >= self.half_open_max_calls:
+                self.stats["rejected"] += 1
+                return False
+            self._probes_in_flight += 1
+
+        self.stats["calls"] += 1
+        return True
+
+    # ---------------------------------------------
+    # outcome
+    # ---------------------------------------------
+    def record_success(self, elapsed: float):
+        self._observe(elapsed)
+        if elapsed > self.slow_call_seconds:
+            # Answered, but too slowly to be worth waiting for.
+            self.stats["slow_calls"] += 1
+            self._on_failure()
+            return
+
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+        self.state = CLOSED
+        self.opened_at = None
+
+    def record_failure(self, elapsed: float):
+        self._observe(elapsed)
+        self._on_failure()
+
+    def _on_failure(self):
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.stats["times_opened"] += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._probes_in_flight = 0
+
+    def _observe(self, elapsed: float):
+        self.last_latency = elapsed
+        # EWMA, so the number tracks the current behaviour of the service.
+        self.avg_latency = (
+            elapsed if self.avg_latency is None
+            else 0.8 * self.avg_latency + 0.2 * elapsed
+        )
+
+    # ---------------------------------------------
+    # introspection
+    # ---------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == OPEN and self.opened_at is not None:
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "open_seconds": self.open_seconds,
+            "slow_call_seconds": self.slow_call_seconds,
+            "retry_in_seconds": round(retry_in, 3) if retry_in is not None else None,
+            "last_latency_seconds": (
+                round(self.last_latency, 4) if self.last_latency is not None else None
+            ),
+            "avg_latency_seconds": (
+                round(self.avg_latency, 4) if self.avg_latency is not None else None
+            ),
+            **self.stats,
+        }
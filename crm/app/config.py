@@ -19,30 +19,192 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# Connection pool (shared by every request in a worker process)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+# Idle connections are closed after this long; keep it well above quiet
+# periods so requests do not pay for a new connection after each one
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", 600))
+# A connection idle longer than this is pinged (SELECT 1, bounded by the
+# ping timeout) before get_db() hands it to a route; a dead one is replaced
+DB_POOL_HEALTHCHECK_IDLE_SECONDS = float(
+    os.getenv("DB_POOL_HEALTHCHECK_IDLE_SECONDS", 30)
+)
+DB_POOL_PING_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_PING_TIMEOUT_SECONDS", 2))
+# Upper bound on the outbox count in GET /metrics (pool wait + query);
+# past it the scrape goes out without that gauge
+METRICS_DB_TIMEOUT_SECONDS = float(os.getenv("METRICS_DB_TIMEOUT_SECONDS", 2))
+
 # -------------------------------------------------
 # Twenty CRM (REST)
 # -------------------------------------------------
 TWENTY_REST_URL = os.getenv("TWENTY_REST_URL")
 TWENTY_REST_TOKEN = os.getenv("TWENTY_REST_TOKEN")
 
+# HTTP client tuning (keep-alive pool, timeouts, retry/backoff)
+TWENTY_CONNECT_TIMEOUT = float(os.getenv("TWENTY_CONNECT_TIMEOUT", 3))
+TWENTY_READ_TIMEOUT = float(os.getenv("TWENTY_READ_TIMEOUT", 10))
+TWENTY_MAX_CONNECTIONS = int(os.getenv("TWENTY_MAX_CONNECTIONS", 20))
+TWENTY_MAX_RETRIES = int(os.getenv("TWENTY_MAX_RETRIES", 4))
+TWENTY_BACKOFF_BASE_SECONDS = float(os.getenv("TWENTY_BACKOFF_BASE_SECONDS", 0.5))
+TWENTY_BACKOFF_MAX_SECONDS = float(os.getenv("TWENTY_BACKOFF_MAX_SECONDS", 30))
+
+# Records per page when walking Twenty list endpoints
+TWENTY_PAGE_SIZE = int(os.getenv("TWENTY_PAGE_SIZE", 60))
+
+# Cap on outbound Twenty calls across the whole deployment (0 = unlimited).
+# Each process enforces its own token bucket, so the budget is split
+# evenly: set TWENTY_RATE_LIMIT_PROCESSES to the number of processes that
+# call Twenty (uvicorn workers + app.worker, plus app.mirror when run on its own).
+# Set it too low and Twenty sees more than TWENTY_RATE_LIMIT_RPS.
+TWENTY_RATE_LIMIT_RPS = float(os.getenv("TWENTY_RATE_LIMIT_RPS", 10))
+TWENTY_RATE_LIMIT_BURST = int(os.getenv("TWENTY_RATE_LIMIT_BURST", 10))
+TWENTY_RATE_LIMIT_PROCESSES = max(1, int(os.getenv("TWENTY_RATE_LIMIT_PROCESSES", 1)))
+
 # -------------------------------------------------
-# Validation (fail fast)
+# Lead read cache (GET /leads/{lead_id})
+# -------------------------------------------------
+LEAD_CACHE_MAX_ENTRIES = int(os.getenv("LEAD_CACHE_MAX_ENTRIES", 10000))
+LEAD_CACHE_TTL_SECONDS = float(os.getenv("LEAD_CACHE_TTL_SECONDS", 30))
+# Broadcast invalidations to every worker via Postgres NOTIFY. Needed for
+# writes made by app.worker (and other API workers) to reach a cache.
+LEAD_CACHE_NOTIFY = os.getenv("LEAD_CACHE_NOTIFY", "false").lower() == "true"
+# How often the API checks its LISTEN connection and reconnects it
+LEAD_CACHE_LISTEN_CHECK_SECONDS = float(os.getenv("LEAD_CACHE_LISTEN_CHECK_SECONDS", 5))
+
+# -------------------------------------------------
+# Twenty reference data cache (workspace members, lookups)
+# -------------------------------------------------
+# Served as-is for TTL seconds, then served stale while one background
+# refresh runs, up to MAX_STALE seconds past expiry.
+TWENTY_REF_CACHE_TTL_SECONDS = float(os.getenv("TWENTY_REF_CACHE_TTL_SECONDS", 300))
+TWENTY_REF_CACHE_MAX_STALE_SECONDS = float(os.getenv("TWENTY_REF_CACHE_MAX_STALE_SECONDS", 3600))
+
+# -------------------------------------------------
+# Bulk lead intake (POST /leads/bulk)
+# -------------------------------------------------
+# Rows per COPY + dedup round (bounds memory per request)
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 5000))
+
+# -------------------------------------------------
+# CRM sync
+# -------------------------------------------------
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", 8))
+# People per /batch/people request (1 = one upsert call per lead)
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", 50))
+# Synced leads written back to Postgres per UPDATE/commit
+SYNC_WRITEBACK_CHUNK = int(os.getenv("SYNC_WRITEBACK_CHUNK", 500))
+
+# Incremental sync of edited leads (POST /sync-crm/changes, app.worker)
+# Leads read per keyset page of the updated_at scan
+SYNC_CHANGES_SCAN_SIZE = int(os.getenv("SYNC_CHANGES_SCAN_SIZE", 1000))
+# Re-scan this far behind the watermark to catch late-committing writes
+SYNC_CHANGES_OVERLAP_SECONDS = float(os.getenv("SYNC_CHANGES_OVERLAP_SECONDS", 300))
+# How often each worker runs the scan (0 = never, endpoint only)
+SYNC_CHANGES_INTERVAL_SECONDS = float(os.getenv("SYNC_CHANGES_INTERVAL_SECONDS", 300))
+# A lead whose push keeps failing is retried with backoff, then given up
+# on ('dead' in crm_sync_failures) until it is edited again
+SYNC_CHANGES_MAX_ATTEMPTS = int(os.getenv("SYNC_CHANGES_MAX_ATTEMPTS", 8))
+SYNC_CHANGES_BACKOFF_BASE_SECONDS = float(os.getenv("SYNC_CHANGES_BACKOFF_BASE_SECONDS", 60))
+SYNC_CHANGES_BACKOFF_MAX_SECONDS = float(os.getenv("SYNC_CHANGES_BACKOFF_MAX_SECONDS", 6 * 3600))
+
+# Background outbox worker (python -m app.worker)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 30))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 10))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", 5))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", 3600))
+# How long a claimed batch stays reserved for its worker; must outlast a
+# slow batch (per-lead fallback plus retries), or another worker redoes it
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", 900))
+
+# -------------------------------------------------
+# Near-duplicate lead linkage (python -m app.linkage)
+# -------------------------------------------------
+# Blocks larger than this are too common to discriminate and are skipped
+LINKAGE_MAX_BLOCK_SIZE = int(os.getenv("LINKAGE_MAX_BLOCK_SIZE", 100))
+LINKAGE_MIN_SCORE = float(os.getenv("LINKAGE_MIN_SCORE", 0.75))
+# Leads / candidate pairs handled per round trip
+LINKAGE_BATCH_SIZE = int(os.getenv("LINKAGE_BATCH_SIZE", 10000))
+
+# -------------------------------------------------
+# Local mirror of Twenty people / tasks / taskTargets (app/mirror.py)
+# -------------------------------------------------
+# Incremental updatedAt poll interval in app.worker (0 = never)
+MIRROR_POLL_SECONDS = float(os.getenv("MIRROR_POLL_SECONDS", 60))
+# Re-read this far behind the watermark (clock skew, late commits)
+MIRROR_OVERLAP_SECONDS = float(os.getenv("MIRROR_OVERLAP_SECONDS", 120))
+# Full reload interval; also the only way polls learn about deletions
+# when webhooks are not configured
+MIRROR_FULL_RELOAD_SECONDS = float(os.getenv("MIRROR_FULL_RELOAD_SECONDS", 86400))
+# Records per COPY + upsert round
+MIRROR_APPLY_BATCH = int(os.getenv("MIRROR_APPLY_BATCH", 1000))
+# HMAC secret of the Twenty webhook (empty = POST /twenty/webhook disabled)
+TWENTY_WEBHOOK_SECRET = os.getenv("TWENTY_WEBHOOK_SECRET", "")
+# Deliveries whose timestamp is further than this from now are rejected
+TWENTY_WEBHOOK_TOLERANCE_SECONDS = float(os.getenv("TWENTY_WEBHOOK_TOLERANCE_SECONDS", 300))
+
+# -------------------------------------------------
+# Task auto-assign pipeline
+# -------------------------------------------------
+# Ollama generations in flight (CPU-bound on the LLM host)
+ASSIGN_LLM_CONCURRENCY = int(os.getenv("ASSIGN_LLM_CONCURRENCY", 2))
+# Twenty task POSTs in flight
+ASSIGN_TASK_CONCURRENCY = int(os.getenv("ASSIGN_TASK_CONCURRENCY", 4))
+# Notes generated ahead of task creation (bounds memory)
+ASSIGN_PIPELINE_BUFFER = int(os.getenv("ASSIGN_PIPELINE_BUFFER", 16))
+
+# -------------------------------------------------
+# Ollama circuit breaker (app/circuit.py)
+# -------------------------------------------------
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 3))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", 60))
+# Answers slower than this count as failures
+LLM_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", 6))
+
 # -------------------------------------------------
-missing = []
+# LLM note cache (app/llm_cache.py)
+# -------------------------------------------------
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR", BASE_DIR / ".cache" / "llm"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", 512))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+# -------------------------------------------------
+# Request profiling (app/profiling.py)
+# -------------------------------------------------
+# A request is profiled when it sends PROFILE_HEADER with PROFILE_TOKEN
+# as its value, or is picked by PROFILE_SAMPLE_RATE. Without a token,
+# header profiling and the /profiles endpoints are disabled.
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_SLOW_SPAN_MS = float(os.getenv("PROFILE_SLOW_SPAN_MS", 500))
+PROFILE_MAX_PROFILES = int(os.getenv("PROFILE_MAX_PROFILES", 50))
+PROFILE_MAX_SPANS = int(os.getenv("PROFILE_MAX_SPANS", 5000))
+
+# -------------------------------------------------
+# Startup warm-up (app/warmup.py)
+# -------------------------------------------------
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 120))
+WARMUP_OLLAMA = os.getenv("WARMUP_OLLAMA", "true").lower() == "true"
+# How long Ollama keeps the model loaded after the last request.
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
 
-for key, val in {
-    "DB_HOST": DB_HOST,
-    "DB_NAME": DB_NAME,
-    "DB_USER": DB_USER,
-    "DB_PASSWORD": DB_PASSWORD,
-    "TWENTY_REST_URL": TWENTY_REST_URL,
-    "TWENTY_REST_TOKEN": TWENTY_REST_TOKEN,
-}.items():
-    if not val:
-        missing.append(key)
+# -------------------------------------------------
+# Validation (fail fast)
+#
+# Called by the API warm-up and by each command's main() rather than at
+# import, so importing a module never raises.
+# -------------------------------------------------
+DB_SETTINGS = ("DB_HOST", "DB_NAME", "DB_USER", "DB_PASSWORD")
+TWENTY_SETTINGS = ("TWENTY_REST_URL", "TWENTY_REST_TOKEN")
 
-if missing:
-    raise RuntimeError(
-        f"Missing required environment variables: {', '.join(missing)}"
-    )
 
+def validate_config(keys=DB_SETTINGS + TWENTY_SETTINGS):
+    missing = [key for key in keys if not globals()[key]]
+    if missing:
+        raise RuntimeError(
+            f"Missing required environment variables: {', '.join(missing)}"
+        )
@@ -1,30 +1,86 @@
-import requests
+import asyncio
+import hashlib
+import heapq
+import json
 import random
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
 
-from app.config import TWENTY_REST_URL, TWENTY_REST_TOKEN
+from app.cache import reference_cache
+from app.config import TWENTY_REST_URL, TWENTY_REST_TOKEN, TWENTY_PAGE_SIZE
 from app.llm import generate_sales_followup_markdown
+from app.twenty import TwentyClient
 
-# No os.getenv here. Config already validated.
+# No os.getenv here. The token is checked by config.validate_config()
+# during startup (app/warmup.py), not at import.
 HEADERS = {
     "Authorization": f"Bearer {TWENTY_REST_TOKEN}",
     "Content-Type": "application/json",
     "Prefer": "resolution=merge-duplicates,return=representation",
 }
 
-if not TWENTY_REST_TOKEN:
-    raise RuntimeError("TWENTY_REST_TOKEN not set")
-
 #HEADERS = {
  #   "Authorization": f"Bearer {TWENTY_REST_TOKEN}",
  #   "Content-Type": "application/json",
 #}
 
+
+# One keep-alive client for every call below (closed by the app lifespan).
+twenty = TwentyClient(TWENTY_REST_URL, HEADERS)
+
+
+# -------------------------------------------------
+# CURSOR PAGINATION
+# -------------------------------------------------
+async def _fetch_page(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    r = await twenty.get(path, params=params)
+    if not r.is_success:
+        raise RuntimeError(f"CRM list {path} failed: {r.text}")
+    return r.json()
+
+
+async def iter_records(
+    path: str,
+    object_name: str,
+    params: Optional[Dict[str, Any]] = None,
+    page_size: int = TWENTY_PAGE_SIZE,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream every record of a Twenty list endpoint, page by page.
+
+    Follows `pageInfo.endCursor` via `starting_after`, and requests the
+    next page while the caller is still consuming the current one, so at
+    most two pages are held in memory.
+    """
+    base = dict(params or {})
+    base["limit"] = page_size
+
+    pending = asyncio.ensure_future(_fetch_page(path, base))
+    try:
+        while pending is not None:
+            body = await pending
+            pending = None
+
+            records = body.get("data", {}).get(object_name, [])
+            page_info = body.get("pageInfo") or {}
+            cursor = page_info.get("endCursor")
+
+            if page_info.get("hasNextPage") and cursor and records:
+                pending = asyncio.ensure_future(
+                    _fetch_page(path, {**base, "starting_after": cursor})
+                )
+
+            for record in records:
+                yield record
+    finally:
+        # Caller stopped early: do not leave a prefetch running.
+        if pending is not None:
+            pending.cancel()
+
 #
 # -------------------------------------------------
 # PEOPLE UPSERT
 # -------------------------------------------------
-def upsert_person_in_crm(lead: Dict[str, Any]) -> str:
+def build_person_payload(lead: Dict[str, Any]) -> Dict[str, Any]:
     email = lead.get("email")
     if not email:
         raise ValueError("Email is required for CRM sync")
@@ -48,28 +104,57 @@ def upsert_person_in_crm(lead: Dict[str, Any]) -> str:
         except (TypeError, ValueError):
             pass
 
-    # 1️⃣ UPSERT
-    r = requests.post(
-        f"{TWENTY_REST_URL}/people?upsert=true",
-        headers=HEADERS,
-        json=payload,
-        timeout=10,
-    )
+    return payload
 
-    if not r.ok:
-        raise RuntimeError(f"CRM upsert failed: {r.text}")
 
-    # 2️⃣ ALWAYS FETCH PERSON BY EMAIL (SOURCE OF TRUTH)
-    lookup = requests.get(
-        f"{TWENTY_REST_URL}/people",
-        headers=HEADERS,
+def person_payload_hash(lead: Dict[str, Any]) -> str:
+    """Stable hash of the Twenty payload for `lead` (change detection)."""
+    payload = build_person_payload(lead)
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _records_from_response(body: Any) -> List[Dict[str, Any]]:
+    """
+    Pull person records out of a `return=representation` response.
+
+    Twenty answers with a bare list, a bare record, or a
+    `{"data": {"<mutation>": record-or-list}}` envelope depending on the
+    endpoint and version, so accept all of them.
+    """
+    if isinstance(body, list):
+        return [r for r in body if isinstance(r, dict) and "id" in r]
+
+    if not isinstance(body, dict):
+        return []
+
+    if "id" in body:
+        return [body]
+
+    data = body.get("data")
+    if isinstance(data, dict) and "id" not in data:
+        records = []
+        for value in data.values():
+            records.extend(_records_from_response(value))
+        return records
+
+    return _records_from_response(data)
+
+
+def _record_email(record: Dict[str, Any]) -> str | None:
+    email = (record.get("emails") or {}).get("primaryEmail")
+    return email.lower() if email else None
+
+
+async def find_person_id_by_email(email: str) -> str:
+    lookup = await twenty.get(
+        "/people",
         params={
             "filter[emails.primaryEmail]": email.lower()
         },
-        timeout=10,
     )
 
-    if not lookup.ok:
+    if not lookup.is_success:
         raise RuntimeError(f"CRM lookup failed: {lookup.text}")
 
     people = lookup.json().get("data", {}).get("people", [])
@@ -79,80 +164,201 @@ def upsert_person_in_crm(lead: Dict[str, Any]) -> str:
 
     return people[0]["id"]
 
+
+async def upsert_person_in_crm(lead: Dict[str, Any]) -> str:
+    payload = build_person_payload(lead)
+
+    # Upserts by email: repeating one cannot create a second person.
+    r = await twenty.post(
+        "/people",
+        params={"upsert": "true"},
+        json=payload,
+        idempotent=True,
+    )
+
+    if not r.is_success:
+        raise RuntimeError(f"CRM upsert failed: {r.text}")
+
+    # The upsert echoes the person back (return=representation); only
+    # fall back to a lookup by email if it did not.
+    records = _records_from_response(r.json())
+    if records:
+        return records[0]["id"]
+
+    return await find_person_id_by_email(payload["emails"]["primaryEmail"])
+
+
 # -------------------------------------------------
-# WORKSPACE MEMBERS
+# BATCH PEOPLE UPSERT
 # -------------------------------------------------
-def get_workspace_members() -> List[Dict[str, Any]]:
-    r = requests.get(
-        f"{TWENTY_REST_URL}/workspaceMembers",
-        headers=HEADERS,
-        timeout=10,
+async def upsert_people_in_crm(leads: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Upsert many leads with ONE request to `/batch/people`.
+
+    Returns `{lead_id: crm_person_id}`. Leads that share an email are sent
+    once and all receive the same person id. Raises if the batch call
+    fails; callers decide how to isolate the bad lead.
+    """
+    payload_by_email: Dict[str, Dict[str, Any]] = {}
+    lead_ids_by_email: Dict[str, List[str]] = {}
+    for lead in leads:
+        payload = build_person_payload(lead)
+        email = payload["emails"]["primaryEmail"]
+        payload_by_email[email] = payload
+        lead_ids_by_email.setdefault(email, []).append(lead["lead_id"])
+
+    r = await twenty.post(
+        "/batch/people",
+        params={"upsert": "true"},
+        json=list(payload_by_email.values()),
+        idempotent=True,
     )
-    if not r.ok:
-        raise RuntimeError(r.text)
-    return r.json()["data"]["workspaceMembers"]
+
+    if not r.is_success:
+        raise RuntimeError(f"CRM batch upsert failed: {r.text}")
+
+    person_id_by_email = {
+        _record_email(rec): rec["id"]
+        for rec in _records_from_response(r.json())
+        if _record_email(rec)
+    }
+
+    result: Dict[str, str] = {}
+    for email, lead_ids in lead_ids_by_email.items():
+        person_id = person_id_by_email.get(email)
+        if person_id is None:
+            person_id = await find_person_id_by_email(email)
+        for lead_id in lead_ids:
+            result[lead_id] = person_id
+
+    return result
 
 
 # -------------------------------------------------
-# TASK LOAD
+# UPDATE A KNOWN PERSON (incremental sync)
 # -------------------------------------------------
-def get_open_task_count(member_id: str) -> int:
-    r = requests.get(
-        f"{TWENTY_REST_URL}/tasks",
-        headers=HEADERS,
-        params={
-            "filter[assigneeId]": member_id,
-            "filter[status]": "TODO",
-        },
-        timeout=10,
+async def update_person_in_crm(crm_person_id: str, lead: Dict[str, Any]) -> str:
+    """
+    PATCH the person we already linked to `lead`, skipping the
+    upsert-by-email path. If the person no longer exists in Twenty the
+    lead is upserted again; returns the (possibly new) person id.
+    """
+    payload = build_person_payload(lead)
+
+    r = await twenty.request(
+        "PATCH", f"/people/{crm_person_id}", json=payload, idempotent=True
     )
-    return r.json().get("totalCount", 0)
 
+    if r.status_code == 404:
+        return await upsert_person_in_crm(lead)
 
-def pick_member_with_lowest_load(members: List[Dict[str, Any]]) -> Dict[str, Any]:
-    loads = [(m, get_open_task_count(m["id"])) for m in members]
-    min_load = min(c for _, c in loads)
-    return random.choice([m for m, c in loads if c == min_load])
+    if not r.is_success:
+        raise RuntimeError(f"CRM update failed: {r.text}")
+
+    return crm_person_id
 
 
 # -------------------------------------------------
-# PEOPLE WITHOUT TODO TASKS
+# WORKSPACE MEMBERS
 # -------------------------------------------------
-def get_people_without_open_tasks() -> List[Dict[str, Any]]:
-    r_people = requests.get(
-        f"{TWENTY_REST_URL}/people",
-        headers=HEADERS,
-        timeout=10,
-    )
-    people = r_people.json()["data"]["people"]
+async def _fetch_workspace_members() -> List[Dict[str, Any]]:
+    return [m async for m in iter_records("/workspaceMembers", "workspaceMembers")]
 
-    r_tasks = requests.get(
-        f"{TWENTY_REST_URL}/tasks",
-        headers=HEADERS,
-        params={"filter[status]": "TODO"},
-        timeout=10,
-    )
-    tasks = r_tasks.json()["data"]["tasks"]
-    existing_titles = {t["title"] for t in tasks}
 
-    eligible = []
-    for p in people:
-        name = f"{p['name']['firstName']} {p['name']['lastName']}"
-        title = f"📞 Sales Follow-up — {name}"
-        if title not in existing_titles:
-            eligible.append(p)
+async def get_workspace_members() -> List[Dict[str, Any]]:
+    """Workspace members through the shared reference cache (app/cache.py)."""
+    members = await reference_cache.get("workspaceMembers", _fetch_workspace_members)
+    return list(members)
+
 
-    return eligible
+# -------------------------------------------------
+# TASK LOAD
+# -------------------------------------------------
+class MemberLoadLedger:
+    """
+    In-memory open-task ledger for one auto-assign run.
+
+    Seeded once from the mirror's open-task counts (app/mirror.py), then
+    kept current as tasks are handed out, so picking the least-loaded
+    member costs O(log n). Ties are broken at random.
+    """
+
+    def __init__(self, members: List[Dict[str, Any]], loads: Dict[str, int]):
+        self._members = {m["id"]: m for m in members}
+        self._load = {m["id"]: loads.get(m["id"], 0) for m in members}
+        self._heap = [(load, member_id) for member_id, load in self._load.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_current(self):
+        # Entries are never updated in place; stale ones are skipped here.
+        while self._heap:
+            load, member_id = heapq.heappop(self._heap)
+            if self._load[member_id] == load:
+                return load, member_id
+        raise RuntimeError("No workspace members to assign to")
+
+    def reserve(self) -> Dict[str, Any]:
+        """Pick a least-loaded member and count the new task against them."""
+        min_load, member_id = self._pop_current()
+        tied = [member_id]
+        while self._heap and self._heap[0][0] == min_load:
+            load, other_id = heapq.heappop(self._heap)
+            if self._load[other_id] == load:
+                tied.append(other_id)
+
+        chosen = random.choice(tied)
+        for other_id in tied:
+            if other_id != chosen:
+                heapq.heappush(self._heap, (min_load, other_id))
+
+        self._load[chosen] = min_load + 1
+        heapq.heappush(self._heap, (min_load + 1, chosen))
+        return self._members[chosen]
+
+    def release(self, member_id: str):
+        """Undo a reservation whose task was never created."""
+        self._load[member_id] -= 1
+        heapq.heappush(self._heap, (self._load[member_id], member_id))
+
+    def loads(self) -> Dict[str, int]:
+        return dict(self._load)
 
 
 # -------------------------------------------------
 # CREATE TASK
 # -------------------------------------------------
-def create_task_for_person(person: Dict[str, Any], assignee_id: str) -> str:
+FOLLOWUP_TITLE_PREFIX = "📞 Sales Follow-up — "
+
+
+async def create_task_target(task_id: str, person_id: str) -> Dict[str, Any]:
+    """Link a task to a person; returns the taskTarget record."""
+    r = await twenty.post("/taskTargets", json={"taskId": task_id, "personId": person_id})
+
+    if not r.is_success:
+        raise RuntimeError(f"Task target creation failed: {r.text}")
+
+    body = r.json()
+    records = [body] if isinstance(body, dict) and "id" in body else _records_from_response(body)
+    if not records:
+        raise RuntimeError(f"Unexpected task target response: {body}")
+
+    return {"taskId": task_id, "personId": person_id, **records[0]}
+
+
+async def create_task_for_person(
+    person: Dict[str, Any],
+    assignee_id: str,
+    markdown_body: Optional[str] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Create the follow-up task and link it to the person (taskTarget), so
+    the mirror's eligibility anti-join sees it. Returns `(task, target)`.
+    """
     full_name = f"{person['name']['firstName']} {person['name']['lastName']}"
-    markdown_body = generate_sales_followup_markdown(person)
+    if markdown_body is None:
+        markdown_body = await generate_sales_followup_markdown(person)
     payload = {
-        "title": f"📞 Sales Follow-up — {full_name}",
+        "title": f"{FOLLOWUP_TITLE_PREFIX}{full_name}",
         "status": "TODO",
         "assigneeId": assignee_id,
         "bodyV2": {
@@ -160,14 +366,9 @@ def create_task_for_person(person: Dict[str, Any], assignee_id: str) -> str:
         },
     }
 
-    r = requests.post(
-        f"{TWENTY_REST_URL}/tasks",
-        headers=HEADERS,
-        json=payload,
-        timeout=10,
-    )
+    r = await twenty.post("/tasks", json=payload)
 
-    if not r.ok:
+    if not r.is_success:
         raise RuntimeError(f"Task creation failed: {r.text}")
 
     task = r.json()
@@ -176,4 +377,16 @@ def create_task_for_person(person: Dict[str, Any], assignee_id: str) -> str:
     if "id" not in task:
         raise RuntimeError(f"Unexpected task response: {task}")
 
-    return task["id"]
+    try:
+        target = await create_task_target(task["id"], person["id"])
+    except Exception:
+        # An unlinked task would look like "no follow-up yet" and be
+        # duplicated on the next run; remove it and let the caller retry.
+        try:
+            await twenty.request("DELETE", f"/tasks/{task['id']}")
+        except Exception:
+            pass
+        raise
+
+    task = {"title": payload["title"], "status": "TODO", "assigneeId": assignee_id, **task}
+    return task, target
@@ -1,13 +1,112 @@
 # app/db.py
-import psycopg2
-from app.config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
 
+import asyncpg
 
-def get_db_connection():
-    return psycopg2.connect(
+from app.config import (
+    DB_HOST,
+    DB_PORT,
+    DB_NAME,
+    DB_USER,
+    DB_PASSWORD,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MAX_IDLE_SECONDS,
+    DB_POOL_HEALTHCHECK_IDLE_SECONDS,
+    DB_POOL_PING_TIMEOUT_SECONDS,
+)
+
+_pool: asyncpg.Pool | None = None
+# Backend pid -> monotonic time get_db() last released that connection.
+_released_at: Dict[int, float] = {}
+
+
+async def get_db_connection() -> asyncpg.Connection:
+    return await asyncpg.connect(
         host=DB_HOST,
         port=DB_PORT,
-        dbname=DB_NAME,
+        database=DB_NAME,
         user=DB_USER,
         password=DB_PASSWORD,
-    )
\ No newline at end of file
+    )
+
+
+# -------------------------------------------------
+# POOL LIFECYCLE (called from the FastAPI lifespan)
+# -------------------------------------------------
+async def init_pool() -> asyncpg.Pool:
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    _pool = await asyncpg.create_pool(
+        host=DB_HOST,
+        port=DB_PORT,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        # Only closes connections nobody used for a long time; liveness
+        # of merely idle ones is checked on acquire (see get_db).
+        max_inactive_connection_lifetime=DB_POOL_MAX_IDLE_SECONDS,
+    )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is None:
+        return
+
+    await _pool.close()
+    _pool = None
+
+
+def get_pool() -> asyncpg.Pool:
+    if _pool is None:
+        raise RuntimeError("DB pool is not initialized")
+    return _pool
+
+
+# -------------------------------------------------
+# FASTAPI DEPENDENCY
+# -------------------------------------------------
+async def _is_alive(conn) -> bool:
+    idle_since = _released_at.pop(conn.get_server_pid(), None)
+    if idle_since is None or time.monotonic() - idle_since < DB_POOL_HEALTHCHECK_IDLE_SECONDS:
+        return True
+    # A server restart, failover or proxy timeout can drop an idle
+    # connection without asyncpg noticing until the next query.
+    try:
+        await conn.fetchval("SELECT 1", timeout=DB_POOL_PING_TIMEOUT_SECONDS)
+        return True
+    except Exception:
+        return False
+
+
+@asynccontextmanager
+async def acquire_checked():
+    """A pooled connection, pinged first if it sat idle (see _is_alive)."""
+    pool = get_pool()
+    conn = await pool.acquire()
+    if not await _is_alive(conn):
+        # Released closed, the pool reconnects it on the next acquire.
+        conn.terminate()
+        await pool.release(conn)
+        conn = await pool.acquire()
+    try:
+        yield conn
+    finally:
+        if not conn.is_closed():
+            if len(_released_at) > 4 * DB_POOL_MAX_SIZE:
+                _released_at.clear()  # pids of closed connections; costs a ping at most
+            _released_at[conn.get_server_pid()] = time.monotonic()
+        await pool.release(conn)
+
+
+async def get_db():
+    async with acquire_checked() as conn:
+        yield conn
@@ -0,0 +1,296 @@
+# app/linkage.py
+"""
+Nightly near-duplicate lead linkage.
+
+    python -m app.linkage
+
+1. Stream `leads` once and derive blocking keys per lead: normalized
+   phone, canonical email (no +tags, no Gmail dots) and a name phonetic
+   (Soundex of last name + first initial).
+2. Group keys in Postgres; only leads sharing a key become candidate
+   pairs, and blocks above LINKAGE_MAX_BLOCK_SIZE are skipped, so work
+   grows with the number of leads rather than its square.
+3. Score candidate pairs a batch at a time and upsert those at or above
+   LINKAGE_MIN_SCORE into `lead_merge_suggestions`.
+
+Merging itself stays a human decision; reviewed rows keep their status.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.config import (
+    DB_SETTINGS,
+    LINKAGE_MAX_BLOCK_SIZE,
+    LINKAGE_MIN_SCORE,
+    LINKAGE_BATCH_SIZE,
+    validate_config,
+)
+from app.db import init_pool, close_pool
+from app.normalize import canonical_email, normalize_phone, soundex
+
+logger = logging.getLogger("app.linkage")
+
+
+# -------------------------------------------------
+# BLOCKING KEYS
+# -------------------------------------------------
+def blocking_keys(lead) -> List[str]:
+    keys = []
+
+    phone = normalize_phone(lead["phone"])
+    if phone:
+        keys.append(f"phone:{phone}")
+
+    email = canonical_email(lead["email"])
+    if email:
+        keys.append(f"email:{email}")
+
+    last_code = soundex(lead["last_name"])
+    first = (lead["first_name"] or "").strip().lower()
+    if last_code and first:
+        keys.append(f"name:{last_code}:{first[0]}")
+
+    return keys
+
+
+# -------------------------------------------------
+# PAIR SCORING
+# -------------------------------------------------
+def jaro_winkler(a: str, b: str) -> float:
+    if a == b:
+        return 1.0 if a else 0.0
+    if not a or not b:
+        return 0.0
+
+    window = max(0, max(len(a), len(b)) // 2 - 1)
+    a_hit = [False] * len(a)
+    b_hit = [False] * len(b)
+
+    matches = 0
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not b_hit[j] and b[j] == ch:
+                a_hit[i] = b_hit[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    a_seq = [c for c, hit in zip(a, a_hit) if hit]
+    b_seq = [c for c, hit in zip(b, b_hit) if hit]
+    transpositions = sum(x != y for x, y in zip(a_seq, b_seq)) / 2
+
+    jaro = (
+        matches / len(a) + matches / len(b) + (matches - transpositions) / matches
+    ) / 3
+
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def _full_name(first: Optional[str], last: Optional[str]) -> str:
+    return " ".join(f"{first or ''} {last or ''}".lower().replace(".", " ").split())
+
+
+def _email_score(a: Optional[str], b: Optional[str]) -> float:
+    a, b = canonical_email(a), canonical_email(b)
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    a_local, _, a_domain = a.partition("@")
+    b_local, _, b_domain = b.partition("@")
+    return jaro_winkler(a_local, b_local) * (1.0 if a_domain == b_domain else 0.8)
+
+
+# Weights: email and phone are strong identity signals, names only
+# corroborate (many real people share a name).
+EMAIL_WEIGHT, PHONE_WEIGHT, NAME_WEIGHT = 0.4, 0.3, 0.3
+
+
+def score_pairs(pairs: Sequence[Any]) -> List[float]:
+    """
+    Score a whole batch of candidate pairs column by column: one pass per
+    feature over the batch, then a weighted sum per pair.
+    """
+    email = [_email_score(p["email_a"], p["email_b"]) for p in pairs]
+    phone = [
+        1.0 if (pa := normalize_phone(p["phone_a"])) and pa == normalize_phone(p["phone_b"]) else 0.0
+        for p in pairs
+    ]
+    name = [
+        jaro_winkler(
+            _full_name(p["first_name_a"], p["last_name_a"]),
+            _full_name(p["first_name_b"], p["last_name_b"]),
+        )
+        for p in pairs
+    ]
+    return [
+        round(EMAIL_WEIGHT * e + PHONE_WEIGHT * ph + NAME_WEIGHT * n, 4)
+        for e, ph, n in zip(email, phone, name)
+    ]
+
+
+# -------------------------------------------------
+# JOB
+# -------------------------------------------------
+async def _load_blocking_keys(reader, writer, batch_size: int) -> int:
+    """Stream every lead once and COPY its keys into `linkage_keys`."""
+    scanned = 0
+    buffer = []
+    async with reader.transaction(isolation="repeatable_read", readonly=True):
+        async for lead in reader.cursor(
+            "SELECT lead_id, first_name, last_name, email, phone FROM leads",
+            prefetch=batch_size,
+        ):
+            scanned += 1
+            buffer.extend((lead["lead_id"], key) for key in blocking_keys(lead))
+            if len(buffer) >= batch_size:
+                await writer.copy_records_to_table("linkage_keys", records=buffer)
+                buffer = []
+
+    if buffer:
+        await writer.copy_records_to_table("linkage_keys", records=buffer)
+    return scanned
+
+
+async def run_linkage(
+    pool,
+    max_block_size: int = LINKAGE_MAX_BLOCK_SIZE,
+    min_score: float = LINKAGE_MIN_SCORE,
+    batch_size: int = LINKAGE_BATCH_SIZE,
+) -> Dict[str, Any]:
+    started = time.monotonic()
+    stats = {"leads_scanned": 0, "oversized_blocks": 0, "candidate_pairs": 0, "suggestions": 0}
+
+    async with pool.acquire() as reader, pool.acquire() as work, pool.acquire() as out:
+        # Temp tables live on `work`, which also streams the pairs back.
+        await work.execute("""
+            DROP TABLE IF EXISTS linkage_keys, linkage_pairs;
+            CREATE TEMP TABLE linkage_keys (
+                lead_id   TEXT NOT NULL,
+                block_key TEXT NOT NULL
+            );
+            CREATE TEMP TABLE linkage_pairs (
+                lead_id_a TEXT NOT NULL,
+                lead_id_b TEXT NOT NULL,
+                reasons   TEXT[] NOT NULL
+            );
+        """)
+        try:
+            stats["leads_scanned"] = await _load_blocking_keys(reader, work, batch_size)
+
+            await work.execute("CREATE INDEX ON linkage_keys (block_key, lead_id)")
+            await work.execute("ANALYZE linkage_keys")
+            stats["oversized_blocks"] = await work.fetchval(
+                """
+                SELECT count(*) FROM (
+                    SELECT 1 FROM linkage_keys
+                    GROUP BY block_key
+                    HAVING count(*) > $1
+                ) big
+                """,
+                max_block_size,
+            )
+
+            # A pair found via several keys appears once, with all of them.
+            status = await work.execute(
+                """
+                INSERT INTO linkage_pairs (lead_id_a, lead_id_b, reasons)
+                WITH blocks AS (
+                    SELECT block_key
+                    FROM linkage_keys
+                    GROUP BY block_key
+                    HAVING count(*) BETWEEN 2 AND $1
+                )
+                SELECT
+                    a.lead_id AS lead_id_a,
+                    b.lead_id AS lead_id_b,
+                    array_agg(DISTINCT split_part(a.block_key, ':', 1)) AS reasons
+                FROM blocks k
+                JOIN linkage_keys a ON a.block_key = k.block_key
+                JOIN linkage_keys b ON b.block_key = k.block_key AND a.lead_id < b.lead_id
+                GROUP BY a.lead_id, b.lead_id
+                """,
+                max_block_size,
+            )
+            stats["candidate_pairs"] = int(status.split()[-1])  # "INSERT 0 <n>"
+
+            async with work.transaction(readonly=True):
+                batch = []
+                async for pair in work.cursor(
+                    """
+                    SELECT
+                        p.lead_id_a, p.lead_id_b, p.reasons,
+                        la.first_name AS first_name_a, la.last_name AS last_name_a,
+                        la.email AS email_a, la.phone AS phone_a,
+                        lb.first_name AS first_name_b, lb.last_name AS last_name_b,
+                        lb.email AS email_b, lb.phone AS phone_b
+                    FROM linkage_pairs p
+                    JOIN leads la ON la.lead_id = p.lead_id_a
+                    JOIN leads lb ON lb.lead_id = p.lead_id_b
+                    """,
+                    prefetch=batch_size,
+                ):
+                    batch.append(pair)
+                    if len(batch) >= batch_size:
+                        stats["suggestions"] += await _write_suggestions(out, batch, min_score)
+                        batch = []
+                if batch:
+                    stats["suggestions"] += await _write_suggestions(out, batch, min_score)
+        finally:
+            await work.execute("DROP TABLE IF EXISTS linkage_keys, linkage_pairs")
+
+    stats["elapsed_s"] = round(time.monotonic() - started, 3)
+    return stats
+
+
+async def _write_suggestions(conn, pairs, min_score: float) -> int:
+    rows = [
+        (p["lead_id_a"], p["lead_id_b"], score, list(p["reasons"]))
+        for p, score in zip(pairs, score_pairs(pairs))
+        if score >= min_score
+    ]
+    if not rows:
+        return 0
+
+    # Re-runs refresh open suggestions but never reopen reviewed ones.
+    await conn.executemany(
+        """
+        INSERT INTO lead_merge_suggestions (lead_id_a, lead_id_b, score, reasons)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (lead_id_a, lead_id_b) DO UPDATE
+        SET score = EXCLUDED.score,
+            reasons = EXCLUDED.reasons,
+            updated_at = now()
+        WHERE lead_merge_suggestions.status = 'open'
+        """,
+        rows,
+    )
+    return len(rows)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    validate_config(DB_SETTINGS)
+
+    async def _main():
+        pool = await init_pool()
+        try:
+            stats = await run_linkage(pool)
+        finally:
+            await close_pool()
+        print(json.dumps(stats))
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
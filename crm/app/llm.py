@@ -1,9 +1,58 @@
 import os
-from typing import Dict, Any
-import requests
+import time
+from typing import Dict, Any, Optional
+import httpx
 
+from app.circuit import CircuitBreaker
+from app.config import (
+    LLM_BREAKER_FAILURE_THRESHOLD,
+    LLM_BREAKER_OPEN_SECONDS,
+    LLM_BREAKER_SLOW_CALL_SECONDS,
+    OLLAMA_KEEP_ALIVE,
+)
+from app.llm_cache import cache_key, note_cache
+from app.metrics import LLM_NOTES, OLLAMA_REQUEST_SECONDS
+from app.profiling import span
 
-def generate_sales_followup_markdown(person: Dict[str, Any]) -> str:
+# Overridable so benchmarks can point at a stand-in (bench/fake_ollama.py).
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
+OLLAMA_MODEL = "llama3.1:8b"
+OLLAMA_OPTIONS = {
+    "temperature": 0.4,
+}
+
+OLLAMA_TIMEOUT_SECONDS = 8
+
+# One keep-alive client for every Ollama call (closed by the app lifespan).
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _ollama_client() -> httpx.AsyncClient:
+    # Created lazily so it binds to the running event loop.
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=OLLAMA_TIMEOUT_SECONDS)
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# While Ollama is down or overloaded, skip straight to the fallback
+# instead of waiting out the 8s timeout for every task.
+ollama_breaker = CircuitBreaker(
+    "ollama",
+    failure_threshold=LLM_BREAKER_FAILURE_THRESHOLD,
+    open_seconds=LLM_BREAKER_OPEN_SECONDS,
+    slow_call_seconds=LLM_BREAKER_SLOW_CALL_SECONDS,
+)
+
+
+async def generate_sales_followup_markdown(person: Dict[str, Any]) -> str:
     """
     Generate a rich, conversion-focused markdown body for the CRM task
     using a local LLM (Ollama). Falls back to a static template if the
@@ -15,6 +64,7 @@ def generate_sales_followup_markdown(person: Dict[str, Any]) -> str:
     # Feature flag to disable LLM usage without code changes.
     enable_llm = os.getenv("ENABLE_LLM_COPYWRITING", "true").lower() == "true"
     if not enable_llm:
+        LLM_NOTES.inc("fallback", "disabled")
         return _fallback_template(full_name, email)
 
     prompt = f"""
@@ -44,33 +94,72 @@ Requirements:
 - Do NOT include any markdown code fences or backticks in the output.
 """
 
+    # Same model + options + prompt → same note; skip the generation.
+    key = cache_key(OLLAMA_MODEL, OLLAMA_OPTIONS, prompt)
+    if note_cache is not None:
+        cached = await note_cache.get(key)
+        if cached is not None:
+            LLM_NOTES.inc("cache", "")
+            return cached
+
+    if not ollama_breaker.allow():
+        LLM_NOTES.inc("fallback", "breaker_open")
+        return _fallback_template(full_name, email)
+
+    started = time.monotonic()
     try:
         # Ollama local API – choose any of your installed models, e.g. "llama3.1:8b"
-        resp = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "llama3.1:8b",
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.4,
+        with span("ollama generate", model=OLLAMA_MODEL, person_id=person.get("id")):
+            resp = await _ollama_client().post(
+                OLLAMA_URL,
+                json={
+                    "model": OLLAMA_MODEL,
+                    "prompt": prompt,
+                    "stream": False,
+                    "options": OLLAMA_OPTIONS,
+                    "keep_alive": OLLAMA_KEEP_ALIVE,
                 },
-            },
-            timeout=8,
-        )
-        resp.raise_for_status()
+            )
+            resp.raise_for_status()
         data = resp.json()
         text = (data.get("response") or "").strip()
-
-        if len(text) > 80:
-            return text
     except Exception:
         # On any failure, fall back to static template so task creation still works.
-        pass
+        elapsed = time.monotonic() - started
+        ollama_breaker.record_failure(elapsed)
+        OLLAMA_REQUEST_SECONDS.observe(elapsed, "error")
+        LLM_NOTES.inc("fallback", "error")
+        return _fallback_template(full_name, email)
+
+    # Ollama answered, even if the text is unusable: the service is up.
+    elapsed = time.monotonic() - started
+    ollama_breaker.record_success(elapsed)
+    OLLAMA_REQUEST_SECONDS.observe(elapsed, "ok")
 
+    if len(text) > 80:
+        if note_cache is not None:
+            await note_cache.set(key, text)
+        LLM_NOTES.inc("llm", "")
+        return text
+
+    LLM_NOTES.inc("fallback", "short_response")
     return _fallback_template(full_name, email)
 
 
+async def preload_model(timeout: float) -> None:
+    """
+    Load the model into Ollama's memory ahead of the first note: a
+    generate request without a prompt only loads it and keeps it for
+    OLLAMA_KEEP_ALIVE. Raises if Ollama is unreachable.
+    """
+    resp = await _ollama_client().post(
+        OLLAMA_URL,
+        json={"model": OLLAMA_MODEL, "keep_alive": OLLAMA_KEEP_ALIVE},
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+
+
 def _fallback_template(full_name: str, email: str) -> str:
     """Static body used when LLM is disabled or unavailable."""
     return f"""
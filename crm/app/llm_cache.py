@@ -0,0 +1,190 @@
+# app/llm_cache.py
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_DIR,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_TTL_SECONDS,
+)
+
+
+def cache_key(model: str, options: Dict[str, Any], prompt: str) -> str:
+    """Content address of one generation: same inputs, same key."""
+    blob = json.dumps(
+        {"model": model, "options": options, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class NoteCache:
+    """
+    Two-level cache for generated follow-up notes.
+
+    An in-process LRU answers repeat lookups without touching disk; behind
+    it, one file per key under `directory` survives restarts and is shared
+    by every worker on the host. Entries expire after `ttl` seconds and
+    the oldest files are evicted once the store exceeds `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        memory_entries: int,
+        max_bytes: int,
+        ttl: float,
+    ):
+        self.directory = Path(directory)
+        self.memory_entries = max(0, memory_entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._memory: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._disk_bytes: Optional[int] = None
+        self._evict_lock = asyncio.Lock()
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    # ---------------------------------------------
+    # public API
+    # ---------------------------------------------
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            if now - stored_at < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        found = await asyncio.to_thread(self._read_file, key, now)
+        if found is None:
+            self.stats["misses"] += 1
+            return None
+
+        value, stored_at = found
+        self._remember(key, value, stored_at)
+        self.stats["disk_hits"] += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        now = time.time()
+        self._remember(key, value, now)
+        try:
+            written = await asyncio.to_thread(self._write_file, key, value)
+        except OSError:
+            # A full or read-only disk must not cost us the note itself.
+            return
+        self.stats["stores"] += 1
+
+        if self._disk_bytes is not None:
+            self._disk_bytes += written
+        if self._disk_bytes is None or self._disk_bytes > self.max_bytes:
+            await self._evict()
+
+    def snapshot(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    # ---------------------------------------------
+    # memory LRU
+    # ---------------------------------------------
+    def _remember(self, key: str, value: str, stored_at: float):
+        if not self.memory_entries:
+            return
+        self._memory[key] = (value, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # ---------------------------------------------
+    # disk store (runs in a worker thread)
+    # ---------------------------------------------
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.md"
+
+    def _read_file(self, key: str, now: float):
+        path = self._path(key)
+        try:
+            stored_at = path.stat().st_mtime
+            if now - stored_at >= self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_text(encoding="utf-8"), stored_at
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, value: str) -> int:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = value.encode("utf-8")
+        # Write-then-rename so concurrent readers never see half a note.
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return len(data)
+
+    async def _evict(self):
+        async with self._evict_lock:
+            total, evicted = await asyncio.to_thread(self._evict_files)
+            self._disk_bytes = total
+            self.stats["evictions"] += evicted
+
+    def _evict_files(self):
+        now = time.time()
+        files = []
+        for path in self.directory.glob("*/*.md"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        # Expired first, then oldest first until under budget.
+        for mtime, size, path in sorted(files):
+            if now - mtime < self.ttl and total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+
+        return total, evicted
+
+
+note_cache: Optional[NoteCache] = (
+    NoteCache(
+        LLM_CACHE_DIR,
+        LLM_CACHE_MEMORY_ENTRIES,
+        LLM_CACHE_MAX_BYTES,
+        LLM_CACHE_TTL_SECONDS,
+    )
+    if LLM_CACHE_ENABLED
+    else None
+)
@@ -1,85 +1,147 @@
 # app/main.py
-from fastapi import FastAPI, HTTPException, Query
+import asyncio
+import base64
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from typing import Optional
 
-from app.db import get_db_connection
-from app.schemas import LeadCreate
-from app.crm import (
-    upsert_person_in_crm,
-    get_workspace_members,
-    pick_member_with_lowest_load,
-    get_people_without_open_tasks,
-    create_task_for_person,
+from app.config import (
+    LEAD_CACHE_NOTIFY,
+    METRICS_DB_TIMEOUT_SECONDS,
+    PROFILE_HEADER,
+    PROFILE_TOKEN,
+    TWENTY_WEBHOOK_SECRET,
 )
+from app.db import acquire_checked, close_pool, get_db, get_pool
+from app.cache import lead_cache, listen_lead_cache, reference_cache
+from app.schemas import LeadCreate
+from app.crm import twenty
 from app.models import (
-    find_existing_lead,
     create_lead,
     get_unsynced_leads,
     search_leads,
-    get_lead_by_id,
-    mark_lead_crm_synced,
+    get_lead_by_id_cached,
+    list_leads_page,
+    iter_leads,
+)
+from app.sync import sync_changed_leads, sync_leads_to_crm
+from app.bulk import CSV, NDJSON, ingest_leads
+from app.assign import auto_assign
+from app.mirror import apply_webhook_event, verify_webhook_signature
+from app.metrics import (
+    CRM_OUTBOX_PENDING,
+    METRICS_COLLECT_ERRORS,
+    MetricsMiddleware,
+    render,
+    update_pool_gauges,
 )
+from app.llm import aclose as close_ollama_client, ollama_breaker
+from app.llm_cache import note_cache
+from app.profiling import (
+    ProfilingMiddleware,
+    check_token,
+    folded_stacks,
+    get_profile,
+    list_profiles,
+)
+from app.warmup import warmup
+
+logger = logging.getLogger("app.main")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Opens the DB pool; Twenty and Ollama warm up in the background
+    # until GET /ready turns 200 (see app/warmup.py).
+    await warmup.start()
+
+    # Cross-worker lead cache invalidation (see app/cache.py).
+    stop = asyncio.Event()
+    listener_task = None
+    if LEAD_CACHE_NOTIFY:
+        listener_task = asyncio.create_task(listen_lead_cache(stop))
+
+    try:
+        yield
+    finally:
+        await warmup.stop()
+        if listener_task is not None:
+            stop.set()
+            await listener_task
+        await twenty.aclose()
+        await close_ollama_client()
+        await close_pool()
 
-app = FastAPI(title="Lead Intake & Task Orchestration API")
+
+app = FastAPI(title="Lead Intake & Task Orchestration API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 # -------------------------------------------------
 # CREATE OR DEDUP LEAD
 # -------------------------------------------------
 @app.post("/leads")
-def create_or_get_lead(payload: LeadCreate):
-    existing_lead_id = find_existing_lead(
-        phone=payload.phone,
-        email=payload.email,
-    )
-    if existing_lead_id:
-        return {"status": "existing", "lead_id": existing_lead_id}
+async def create_or_get_lead(payload: LeadCreate, conn=Depends(get_db)):
+    status, lead_id = await create_lead(conn, payload)
+    return {"status": status, "lead_id": lead_id}
+
+
+# -------------------------------------------------
+# BULK LEAD INTAKE (NDJSON or CSV body)
+# -------------------------------------------------
+@app.post("/leads/bulk")
+async def bulk_create_leads_api(request: Request, conn=Depends(get_db)):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        fmt = CSV
+    elif content_type in ("application/x-ndjson", "application/jsonl", "application/json-lines"):
+        fmt = NDJSON
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Send text/csv or application/x-ndjson",
+        )
 
-    lead_id = create_lead(payload)
-    return {"status": "created", "lead_id": lead_id}
+    return await ingest_leads(conn, request.stream(), fmt)
 
 
 # -------------------------------------------------
 # SYNC UNSYNCED LEADS TO TWENTY CRM
 # -------------------------------------------------
 @app.post("/sync-crm")
-def sync_all_leads_to_crm():
-    synced, failed = [], []
-    leads = get_unsynced_leads()
-
-    for lead in leads:
-        lead_id = lead["lead_id"]
+async def sync_all_leads_to_crm(conn=Depends(get_db)):
+    leads = await get_unsynced_leads(conn)
+    return await sync_leads_to_crm(get_pool(), leads)
 
-        try:
-            crm_person_id = upsert_person_in_crm(lead)
-            mark_lead_crm_synced(lead_id, crm_person_id)
-            synced.append(lead_id)
 
-        except Exception as e:
-            failed.append({
-                "lead_id": lead_id,
-                "error": str(e),
-            })
-
-    return {
-        "total": len(leads),
-        "synced_count": len(synced),
-        "failed_count": len(failed),
-        "synced": synced,
-        "failed": failed,
-    }
+# -------------------------------------------------
+# PUSH EDITS OF SYNCED LEADS TO TWENTY
+# -------------------------------------------------
+@app.post("/sync-crm/changes")
+async def sync_changed_leads_to_crm():
+    result = await sync_changed_leads(get_pool())
+    if result.get("skipped"):
+        raise HTTPException(status_code=409, detail="Changed-lead sync already running")
+    return result
 
 
 # -------------------------------------------------
 # SEARCH LEADS
 # -------------------------------------------------
 @app.get("/leads/search")
-def search_leads_api(
+async def search_leads_api(
     phone: Optional[str] = Query(None),
     email: Optional[str] = Query(None),
     name: Optional[str] = Query(None),
+    conn=Depends(get_db),
 ):
     return {
-        "results": search_leads(
+        "results": await search_leads(
+            conn,
             phone=phone,
             email=email,
             name=name,
@@ -91,69 +153,182 @@ def search_leads_api(
 # GET LEAD BY BUSINESS ID
 # -------------------------------------------------
 @app.get("/leads/{lead_id}")
-def get_lead_details(lead_id: str):
-    lead = get_lead_by_id(lead_id)
+async def get_lead_details(lead_id: str, conn=Depends(get_db)):
+    lead = await get_lead_by_id_cached(conn, lead_id)
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     return lead
 
 
 # -------------------------------------------------
-# LIST ALL LEADS
+# LIST LEADS (keyset pagination / NDJSON stream)
 # -------------------------------------------------
-@app.get("/leads")
-def list_leads():
-    conn = get_db_connection()
-    cur = conn.cursor()
+def _encode_cursor(key) -> str:
+    created_at, lead_id = key
+    raw = json.dumps([created_at.isoformat(), lead_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, lead_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(lead_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    cur.execute("""
-        SELECT lead_id, email, crm_synced
-        FROM leads
-        ORDER BY created_at DESC
-    """)
 
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+async def _stream_leads_ndjson(after):
+    # Own connection: a Depends() connection is released before a
+    # streaming body is sent.
+    async with acquire_checked() as conn:
+        async with conn.transaction():
+            async for lead in iter_leads(conn, after):
+                yield json.dumps(lead) + "\n"
 
-    return [
-        {
-            "lead_id": r[0],
-            "email": r[1],
-            "crm_synced": r[2],
-        }
-        for r in rows
-    ]
+
+@app.get("/leads")
+async def list_leads(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    after = _decode_cursor(cursor) if cursor else None
+
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_leads_ndjson(after),
+            media_type="application/x-ndjson",
+        )
+
+    # Acquired here, not via Depends(get_db): the ndjson branch streams on
+    # its own connection and would hold this one idle for the whole export.
+    async with acquire_checked() as conn:
+        leads, next_key = await list_leads_page(conn, limit, after)
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = _encode_cursor(next_key)
+    return leads
 
 
 # -------------------------------------------------
 # AUTO-ASSIGN CRM TASKS
 # -------------------------------------------------
 @app.post("/tasks/auto-assign")
-def auto_assign_tasks():
-    members = get_workspace_members()
-    people = get_people_without_open_tasks()
-
-    created, failed = [], []
-
-    for person in people:
-        assignee = pick_member_with_lowest_load(members)
-
-        try:
-            task_id = create_task_for_person(person, assignee["id"])
-            created.append({
-                "task_id": task_id,
-                "customer": f"{person['name']['firstName']} {person['name']['lastName']}",
-                "assigned_to": assignee["userEmail"],
-            })
-        except Exception as e:
-            failed.append({
-                "customer": person["name"],
-                "error": str(e),
-            })
+async def auto_assign_tasks():
+    return await auto_assign(get_pool())
+
+
+# -------------------------------------------------
+# TWENTY WEBHOOK → LOCAL MIRROR
+# -------------------------------------------------
+@app.post("/twenty/webhook")
+async def twenty_webhook(request: Request):
+    # Unsigned deliveries could forge people or delete tasks in the mirror.
+    if not TWENTY_WEBHOOK_SECRET:
+        raise HTTPException(status_code=404, detail="Webhook not configured")
+
+    body = await request.body()
+    if not verify_webhook_signature(
+        body,
+        request.headers.get("x-twenty-webhook-timestamp"),
+        request.headers.get("x-twenty-webhook-signature"),
+    ):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body is not JSON")
+
+    applied = await apply_webhook_event(get_pool(), event)
+    return {"applied": applied}
 
+
+# -------------------------------------------------
+# CACHE STATS
+# -------------------------------------------------
+@app.get("/cache/stats")
+async def cache_stats():
     return {
-        "tasks_created": len(created),
-        "tasks_failed": len(failed),
-        "details": created + failed,
+        "lead_cache": lead_cache.snapshot(),
+        "cross_worker_invalidation": LEAD_CACHE_NOTIFY,
+        "reference_cache": reference_cache.snapshot(),
     }
+
+
+# -------------------------------------------------
+# LLM HEALTH (circuit breaker + note cache)
+# -------------------------------------------------
+@app.get("/llm/status")
+async def llm_status():
+    return {
+        "breaker": ollama_breaker.snapshot(),
+        "cache": note_cache.snapshot() if note_cache is not None else None,
+    }
+
+
+# -------------------------------------------------
+# READINESS
+# -------------------------------------------------
+@app.get("/ready")
+async def ready():
+    return JSONResponse(warmup.snapshot(), status_code=200 if warmup.ready else 503)
+
+
+# -------------------------------------------------
+# PROMETHEUS METRICS
+# -------------------------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # A scrape must not fail because the database does: the outbox gauge
+    # is left out and counted instead, the in-process metrics still go out.
+    try:
+        pool = get_pool()
+        update_pool_gauges(pool)
+        async with pool.acquire(timeout=METRICS_DB_TIMEOUT_SECONDS) as conn:
+            # Served by the partial index on pending rows.
+            pending = await conn.fetchval(
+                "SELECT count(*) FROM crm_outbox WHERE status = 'pending'",
+                timeout=METRICS_DB_TIMEOUT_SECONDS,
+            )
+    except Exception as e:
+        logger.warning("metrics: outbox count failed: %s: %s", type(e).__name__, e)
+        CRM_OUTBOX_PENDING.clear()
+        METRICS_COLLECT_ERRORS.inc("crm_outbox_pending")
+    else:
+        CRM_OUTBOX_PENDING.set(pending)
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# -------------------------------------------------
+# REQUEST PROFILES (see app/profiling.py)
+# -------------------------------------------------
+def require_profile_access(request: Request):
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling not configured")
+    if not check_token(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+
+@app.get("/profiles", dependencies=[Depends(require_profile_access)])
+async def profiles():
+    return list_profiles()
+
+
+@app.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_access)])
+async def profile_tree(profile_id: str):
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@app.get("/profiles/{profile_id}/folded", dependencies=[Depends(require_profile_access)])
+async def profile_folded(profile_id: str):
+    folded = folded_stacks(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        folded,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+    )
@@ -0,0 +1,271 @@
+# app/metrics.py
+"""
+In-process metrics in Prometheus text format (GET /metrics).
+
+Deliberately tiny: an observation is one perf_counter() pair, a dict
+lookup and a bisect, so it stays on in the intake hot path. Values are
+per worker process; Prometheus scrapes and sums every worker.
+"""
+import functools
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.profiling import span
+
+LabelValues = Tuple[str, ...]
+
+# Seconds. Routes and SQL are mostly sub-10ms; outbound calls are slower.
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        _REGISTRY.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}"
+            for k, v in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Set directly, or computed at scrape time by `set_function`."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._fn: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def clear(self):
+        """Drop every set value, so the gauge renders no samples."""
+        self._values.clear()
+
+    def set_function(self, fn: Callable[[], Dict[LabelValues, float]]):
+        self._fn = fn
+
+    def render(self) -> List[str]:
+        values = dict(self._values)
+        if self._fn is not None:
+            values.update(self._fn())
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}"
+            for k, v in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = FAST_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _labels(self.labelnames, labels, 'le="%s"' % _fmt(bound))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------
+# METRICS
+# -------------------------------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template and status.",
+    ("method", "route", "status"),
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Time spent in one named database operation (app/models.py, app/mirror.py).",
+    ("query",),
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total",
+    "Named database operations that raised.",
+    ("query",),
+)
+TWENTY_REQUEST_SECONDS = Histogram(
+    "twenty_request_duration_seconds",
+    "Twenty REST call latency per attempt (retries are separate samples).",
+    ("method", "endpoint", "status"),
+    SLOW_BUCKETS,
+)
+TWENTY_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "twenty_rate_limit_wait_seconds",
+    "Time Twenty calls waited for a rate-limiter token.",
+)
+OLLAMA_REQUEST_SECONDS = Histogram(
+    "ollama_request_duration_seconds",
+    "Ollama /api/generate latency.",
+    ("outcome",),
+    SLOW_BUCKETS,
+)
+LLM_NOTES = Counter(
+    "llm_notes_total",
+    "Follow-up notes by source (llm, cache, fallback) and fallback reason.",
+    ("source", "reason"),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "asyncpg pool connections by state (in_use, idle, max).",
+    ("state",),
+)
+CRM_OUTBOX_PENDING = Gauge(
+    "crm_outbox_pending",
+    "Outbox rows waiting for the CRM sync worker.",
+)
+METRICS_COLLECT_ERRORS = Counter(
+    "metrics_collect_errors_total",
+    "Scrape-time collections that failed; their gauges are left out of that scrape.",
+    ("collector",),
+)
+ASSIGN_QUEUE_DEPTH = Gauge(
+    "assign_queue_depth",
+    "Items buffered between auto-assign pipeline stages.",
+    ("queue",),
+)
+
+
+# -------------------------------------------------
+# HELPERS
+# -------------------------------------------------
+def timed_query(fn):
+    """Record an async model function under its own name (and as a profile span)."""
+    name = fn.__name__
+    span_name = f"db {name}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with span(span_name):
+                return await fn(*args, **kwargs)
+        except Exception:
+            DB_QUERY_ERRORS.inc(name)
+            raise
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, name)
+
+    return wrapper
+
+
+def update_pool_gauges(pool):
+    if pool is None:
+        return
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    DB_POOL_CONNECTIONS.set(size - idle, "in_use")
+    DB_POOL_CONNECTIONS.set(idle, "idle")
+    DB_POOL_CONNECTIONS.set(pool.get_max_size(), "max")
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware overhead). Labels by the
+    matched route template, so `/leads/{lead_id}` is one series; the
+    timing includes streamed bodies.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "<unmatched>"),
+                status,
+            )
@@ -0,0 +1,474 @@
+# app/mirror.py
+"""
+Local Postgres mirror of Twenty people, tasks and taskTargets.
+
+    python -m app.mirror                      # refresh (full load if due)
+    python -m app.mirror --full               # force a full reload
+    python -m app.mirror --link-legacy-tasks  # see link_legacy_tasks()
+
+Each object is kept current in three ways:
+
+1. Full load: every record is streamed and upserted; rows not seen are
+   marked deleted. Runs on first use and every MIRROR_FULL_RELOAD_SECONDS.
+2. Incremental poll: records with `updatedAt` past the stored watermark
+   (minus MIRROR_OVERLAP_SECONDS). Runs from app.worker and before every
+   auto-assign, unless another process is already refreshing.
+3. Webhook deltas: POST /twenty/webhook applies single records as Twenty
+   reports them, including deletions.
+
+Upserts never replace a row with an older `updatedAt`, so the three paths
+can interleave freely. With the mirror in place, "people without an open
+follow-up" is an indexed anti-join on person id instead of two full API
+scans and a title comparison.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import (
+    MIRROR_OVERLAP_SECONDS,
+    MIRROR_FULL_RELOAD_SECONDS,
+    MIRROR_APPLY_BATCH,
+    TWENTY_WEBHOOK_SECRET,
+    TWENTY_WEBHOOK_TOLERANCE_SECONDS,
+    validate_config,
+)
+from app.crm import FOLLOWUP_TITLE_PREFIX, create_task_target, iter_records, twenty
+from app.db import init_pool, close_pool
+from app.metrics import timed_query
+
+logger = logging.getLogger("app.mirror")
+
+
+# -------------------------------------------------
+# RECORD → ROW MAPPING
+# -------------------------------------------------
+def _ts(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _person_row(rec: Dict[str, Any]) -> Tuple:
+    name = rec.get("name") or {}
+    emails = rec.get("emails") or {}
+    return (
+        rec["id"],
+        name.get("firstName"),
+        name.get("lastName"),
+        (emails.get("primaryEmail") or "").lower() or None,
+        json.dumps(rec),
+        _ts(rec.get("updatedAt")),
+        _ts(rec.get("deletedAt")),
+    )
+
+
+def _task_row(rec: Dict[str, Any]) -> Tuple:
+    return (
+        rec["id"],
+        rec.get("title"),
+        rec.get("status"),
+        rec.get("assigneeId"),
+        _ts(rec.get("updatedAt")),
+        _ts(rec.get("deletedAt")),
+    )
+
+
+def _task_target_row(rec: Dict[str, Any]) -> Tuple:
+    return (
+        rec["id"],
+        rec.get("taskId"),
+        rec.get("personId"),
+        _ts(rec.get("updatedAt")),
+        _ts(rec.get("deletedAt")),
+    )
+
+
+class MirrorSpec(NamedTuple):
+    object_name: str  # Twenty plural name, also the REST path
+    table: str
+    columns: Tuple[str, ...]  # "updated_at" must come second to last
+    row: Callable[[Dict[str, Any]], Tuple]
+
+
+SPECS: Dict[str, MirrorSpec] = {
+    "people": MirrorSpec(
+        "people",
+        "twenty_people",
+        ("id", "first_name", "last_name", "email", "data", "updated_at", "deleted_at"),
+        _person_row,
+    ),
+    "tasks": MirrorSpec(
+        "tasks",
+        "twenty_tasks",
+        ("id", "title", "status", "assignee_id", "updated_at", "deleted_at"),
+        _task_row,
+    ),
+    "taskTargets": MirrorSpec(
+        "taskTargets",
+        "twenty_task_targets",
+        ("id", "task_id", "person_id", "updated_at", "deleted_at"),
+        _task_target_row,
+    ),
+}
+
+# Webhook eventName prefix ("person.updated") → mirrored object
+_EVENT_OBJECTS = {"person": "people", "task": "tasks", "taskTarget": "taskTargets"}
+
+
+# -------------------------------------------------
+# APPLY RECORDS (shared by load, poll and webhook)
+# -------------------------------------------------
+@timed_query
+async def apply_records(conn, spec: MirrorSpec, records: List[Dict[str, Any]]) -> Optional[datetime]:
+    """
+    Upsert `records` into the mirror table with one COPY + INSERT and
+    return the newest `updatedAt` among them.
+    """
+    rows = [spec.row(r) for r in records if r.get("id")]
+    if not rows:
+        return None
+
+    cols = ", ".join(spec.columns)
+    updates = ", ".join(
+        f"{c} = COALESCE(EXCLUDED.{c}, m.{c})" if c == "updated_at" else f"{c} = EXCLUDED.{c}"
+        for c in spec.columns
+        if c != "id"
+    )
+
+    async with conn.transaction():
+        await conn.execute(
+            f"CREATE TEMP TABLE mirror_staging (LIKE {spec.table} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        await conn.copy_records_to_table("mirror_staging", records=rows, columns=spec.columns)
+        # Out-of-order deliveries (poll vs webhook) never roll a row back.
+        await conn.execute(f"""
+            INSERT INTO {spec.table} AS m ({cols})
+            SELECT DISTINCT ON (id) {cols}
+            FROM mirror_staging
+            ORDER BY id, updated_at DESC NULLS LAST
+            ON CONFLICT (id) DO UPDATE
+            SET {updates}, mirrored_at = now()
+            WHERE m.updated_at IS NULL
+               OR EXCLUDED.updated_at IS NULL
+               OR EXCLUDED.updated_at >= m.updated_at
+        """)
+
+    stamps = [r[-2] for r in rows if r[-2] is not None]
+    return max(stamps) if stamps else None
+
+
+# -------------------------------------------------
+# FULL LOAD / INCREMENTAL POLL
+# -------------------------------------------------
+@asynccontextmanager
+async def _object_lock(pool, object_name: str):
+    """
+    One loader per object across all processes (session advisory lock).
+    Yields None when another process holds it: that refresh is already
+    bringing the mirror up to date, so waiting for it (possibly a full
+    reload) and then polling again would only repeat the work.
+    """
+    key = f"twenty_mirror:{object_name}"
+    async with pool.acquire() as conn:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", key):
+            yield None
+            return
+        try:
+            yield conn
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(hashtext($1))", key)
+
+
+async def _stream_into(conn, spec: MirrorSpec, params: Optional[Dict[str, Any]]) -> Tuple[int, Optional[datetime]]:
+    count, newest, batch = 0, None, []
+
+    async def flush():
+        nonlocal count, newest, batch
+        stamp = await apply_records(conn, spec, batch)
+        if stamp is not None and (newest is None or stamp > newest):
+            newest = stamp
+        count += len(batch)
+        batch = []
+
+    async for record in iter_records(f"/{spec.object_name}", spec.object_name, params):
+        batch.append(record)
+        if len(batch) >= MIRROR_APPLY_BATCH:
+            await flush()
+    if batch:
+        await flush()
+
+    return count, newest
+
+
+async def _save_state(conn, object_name: str, watermark: Optional[datetime], full_load_at: Optional[datetime] = None):
+    await conn.execute(
+        """
+        INSERT INTO twenty_mirror_state (object_name, watermark, full_load_at)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (object_name) DO UPDATE
+        SET watermark = GREATEST(twenty_mirror_state.watermark, EXCLUDED.watermark),
+            full_load_at = COALESCE(EXCLUDED.full_load_at, twenty_mirror_state.full_load_at)
+        """,
+        object_name,
+        watermark,
+        full_load_at,
+    )
+
+
+async def refresh_object(pool, spec: MirrorSpec, full: bool = False) -> Dict[str, Any]:
+    """
+    Full load when forced, never done or overdue; otherwise a poll.
+    Skipped while another process is refreshing the same object.
+    """
+    async with _object_lock(pool, spec.object_name) as conn:
+        if conn is None:
+            return {"mode": "skipped", "records": 0}
+
+        db_now = await conn.fetchval("SELECT now()")
+        state = await conn.fetchrow(
+            "SELECT watermark, full_load_at FROM twenty_mirror_state WHERE object_name = $1",
+            spec.object_name,
+        )
+        watermark = state["watermark"] if state else None
+        full_load_at = state["full_load_at"] if state else None
+
+        full = (
+            full
+            or watermark is None
+            or full_load_at is None
+            or db_now - full_load_at > timedelta(seconds=MIRROR_FULL_RELOAD_SECONDS)
+        )
+
+        if full:
+            count, newest = await _stream_into(conn, spec, None)
+            # Anything the load did not touch no longer exists in Twenty.
+            await conn.execute(
+                f"UPDATE {spec.table} SET deleted_at = now(), mirrored_at = now() "
+                f"WHERE deleted_at IS NULL AND mirrored_at < $1",
+                db_now,
+            )
+            await _save_state(conn, spec.object_name, newest or db_now, db_now)
+        else:
+            since = watermark - timedelta(seconds=MIRROR_OVERLAP_SECONDS)
+            params = {
+                "filter": f'updatedAt[gte]:"{since.isoformat()}"',
+                "order_by": "updatedAt",
+            }
+            count, newest = await _stream_into(conn, spec, params)
+            if newest is not None:
+                await _save_state(conn, spec.object_name, newest)
+
+    return {"mode": "full" if full else "poll", "records": count}
+
+
+async def refresh_mirror(pool, full: bool = False) -> Dict[str, Any]:
+    results = await asyncio.gather(*(refresh_object(pool, spec, full) for spec in SPECS.values()))
+    return dict(zip(SPECS, results))
+
+
+# -------------------------------------------------
+# WEBHOOK DELTAS
+# -------------------------------------------------
+def verify_webhook_signature(body: bytes, timestamp: Optional[str], signature: Optional[str]) -> bool:
+    """
+    HMAC-SHA256 of "<timestamp>:<body>" as sent by Twenty webhooks, with
+    the timestamp within TWENTY_WEBHOOK_TOLERANCE_SECONDS of now so a
+    captured delivery cannot be replayed later. Always False without a
+    configured secret.
+    """
+    if not TWENTY_WEBHOOK_SECRET or not timestamp or not signature:
+        return False
+
+    try:
+        sent_at = float(timestamp)
+    except ValueError:
+        return False
+    if sent_at > 1e11:
+        # Milliseconds since the epoch
+        sent_at /= 1000
+    if abs(time.time() - sent_at) > TWENTY_WEBHOOK_TOLERANCE_SECONDS:
+        return False
+
+    expected = hmac.new(
+        TWENTY_WEBHOOK_SECRET.encode("utf-8"),
+        timestamp.encode("utf-8") + b":" + body,
+        hashlib.sha256,
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+async def apply_webhook_event(pool, event: Dict[str, Any]) -> bool:
+    """Apply one webhook delivery; returns False for objects we do not mirror."""
+    object_name, _, action = str(event.get("eventName", "")).partition(".")
+    spec = SPECS.get(_EVENT_OBJECTS.get(object_name, ""))
+    record = event.get("record")
+    if spec is None or not isinstance(record, dict) or not record.get("id"):
+        return False
+
+    if action in ("deleted", "destroyed") and not record.get("deletedAt"):
+        deleted_at = event.get("eventDate") or datetime.now(timezone.utc).isoformat()
+        record = {**record, "deletedAt": deleted_at}
+
+    async with pool.acquire() as conn:
+        await apply_records(conn, spec, [record])
+    return True
+
+
+# -------------------------------------------------
+# WRITE-THROUGH FROM create_task_for_person
+# -------------------------------------------------
+async def record_created_task(pool, task: Dict[str, Any], target: Dict[str, Any]):
+    """Mirror a task we just created so the next eligibility read sees it."""
+    async with pool.acquire() as conn:
+        await apply_records(conn, SPECS["tasks"], [task])
+        await apply_records(conn, SPECS["taskTargets"], [target])
+
+
+# -------------------------------------------------
+# READS
+# -------------------------------------------------
+ELIGIBLE_PEOPLE_SQL = """
+    SELECT p.id, p.data::text AS data
+    FROM twenty_people p
+    WHERE p.deleted_at IS NULL
+      AND p.id > $1
+      AND NOT EXISTS (
+          SELECT 1
+          FROM twenty_task_targets tt
+          JOIN twenty_tasks t ON t.id = tt.task_id
+          WHERE tt.person_id = p.id
+            AND tt.deleted_at IS NULL
+            AND t.status = 'TODO'
+            AND t.deleted_at IS NULL
+      )
+    ORDER BY p.id
+    LIMIT $2
+"""
+
+
+@timed_query
+async def _eligible_people_page(conn, after: str, page_size: int):
+    return await conn.fetch(ELIGIBLE_PEOPLE_SQL, after, page_size)
+
+
+async def iter_people_without_open_tasks(pool, page_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream mirrored people with no open (TODO) task linked to them.
+
+    Keyset pages on person id; no connection is held between pages, so a
+    slow consumer (the auto-assign pipeline) never pins one.
+    """
+    after = ""
+    while True:
+        async with pool.acquire() as conn:
+            rows = await _eligible_people_page(conn, after, page_size)
+        if not rows:
+            return
+        after = rows[-1]["id"]
+        for row in rows:
+            yield json.loads(row["data"])
+
+
+@timed_query
+async def get_open_task_counts(pool, member_ids: List[str]) -> Dict[str, int]:
+    """Open TODO counts per member from the mirror (no Twenty call)."""
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT assignee_id, count(*) AS open_tasks
+            FROM twenty_tasks
+            WHERE status = 'TODO'
+              AND deleted_at IS NULL
+              AND assignee_id = ANY($1::text[])
+            GROUP BY assignee_id
+            """,
+            member_ids,
+        )
+
+    counts = {member_id: 0 for member_id in member_ids}
+    counts.update({r["assignee_id"]: r["open_tasks"] for r in rows})
+    return counts
+
+
+# -------------------------------------------------
+# ONE-OFF: LINK FOLLOW-UPS CREATED BEFORE TASK TARGETS
+# -------------------------------------------------
+async def link_legacy_tasks(pool) -> int:
+    """
+    Follow-up tasks created before the mirror existed have no taskTarget,
+    so the anti-join cannot see them. Link each open one whose title
+    names exactly one mirrored person, in Twenty and in the mirror.
+    """
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT t.id AS task_id, min(p.id) AS person_id
+            FROM twenty_tasks t
+            JOIN twenty_people p
+              ON t.title = $1 || coalesce(p.first_name, '') || ' ' || coalesce(p.last_name, '')
+             AND p.deleted_at IS NULL
+            WHERE t.status = 'TODO'
+              AND t.deleted_at IS NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM twenty_task_targets tt
+                  WHERE tt.task_id = t.id AND tt.deleted_at IS NULL
+              )
+            GROUP BY t.id
+            HAVING count(*) = 1
+            """,
+            FOLLOWUP_TITLE_PREFIX,
+        )
+
+    linked = 0
+    for row in rows:
+        try:
+            target = await create_task_target(row["task_id"], row["person_id"])
+        except Exception:
+            logger.exception("could not link task %s", row["task_id"])
+            continue
+        async with pool.acquire() as conn:
+            await apply_records(conn, SPECS["taskTargets"], [target])
+        linked += 1
+
+    return linked
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    validate_config()
+
+    parser = argparse.ArgumentParser(description="Refresh the local Twenty mirror.")
+    parser.add_argument("--full", action="store_true", help="reload every object from scratch")
+    parser.add_argument(
+        "--link-legacy-tasks",
+        action="store_true",
+        help="after refreshing, link open follow-ups that have no taskTarget",
+    )
+    args = parser.parse_args()
+
+    async def _main():
+        pool = await init_pool()
+        try:
+            stats = await refresh_mirror(pool, full=args.full)
+            if args.link_legacy_tasks:
+                stats["legacy_tasks_linked"] = await link_legacy_tasks(pool)
+        finally:
+            await twenty.aclose()
+            await close_pool()
+        print(json.dumps(stats))
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,149 +1,644 @@
-from app.db import get_db_connection
+from app.cache import LEAD_CACHE_CHANNEL, MISS, lead_cache
+from app.config import LEAD_CACHE_NOTIFY
+from app.metrics import timed_query
+from app.normalize import normalize_email, normalize_phone
+
+# NOTIFY channel that wakes app/worker.py when a lead is queued.
+OUTBOX_CHANNEL = "crm_outbox"
 
 # -------------------------------------------------
-# Find existing lead (email preferred, phone fallback)
-# RETURNS lead_id (business ID)
+# All functions take a pooled asyncpg connection (see app.db.get_db)
+# and never close it; the pool owns its lifecycle.
 # -------------------------------------------------
-def find_existing_lead(phone: str, email: str | None):
-    conn = get_db_connection()
-    cur = conn.cursor()
 
-    if email:
-        cur.execute(
-            "SELECT lead_id FROM leads WHERE email = %s LIMIT 1",
-            (email,)
-        )
-        row = cur.fetchone()
-        if row:
-            cur.close()
-            conn.close()
-            return row[0]
+# -------------------------------------------------
+# Create new lead, or return the one it duplicates
+# RETURNS ("created" | "existing", lead_id)
+#
+# One statement: the INSERT arbitrates on the unique lead_id /
+# email_norm / phone_norm indexes, so concurrent intake of the same
+# person cannot create two rows. A created lead also gets its outbox
+# row and NOTIFY in the same statement (see app/worker.py).
+# -------------------------------------------------
+CREATE_LEAD_SQL = f"""
+WITH ins AS (
+    INSERT INTO leads (
+        lead_id,
+        first_name,
+        last_name,
+        full_name,
+        email,
+        phone,
+        employment_status,
+        job_title,
+        monthly_salary_min,
+        monthly_salary_max,
+        email_norm,
+        phone_norm,
+        crm_synced,
+        task_created
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, false, false)
+    ON CONFLICT DO NOTHING
+    RETURNING lead_id
+),
+outbox AS (
+    INSERT INTO crm_outbox (lead_id)
+    SELECT lead_id FROM ins
+    RETURNING lead_id
+)
+SELECT o.lead_id, 'created' AS status
+FROM outbox o
+CROSS JOIN LATERAL pg_notify('{OUTBOX_CHANNEL}', o.lead_id)
+UNION ALL
+(
+    SELECT l.lead_id, 'existing' AS status
+    FROM leads l
+    WHERE NOT EXISTS (SELECT 1 FROM ins)
+      AND (l.lead_id = $1 OR l.email_norm = $11 OR l.phone_norm = $12)
+    ORDER BY (l.email_norm = $11) IS TRUE DESC,
+             (l.phone_norm = $12) IS TRUE DESC
+    LIMIT 1
+)
+"""
 
-    if phone:
-        cur.execute(
-            "SELECT lead_id FROM leads WHERE phone = %s LIMIT 1",
-            (phone,)
-        )
-        row = cur.fetchone()
+
+@timed_query
+async def create_lead(conn, data):
+    args = (
+        data.lead_id,
+        data.first_name,
+        data.last_name,
+        data.full_name,
+        data.email,
+        data.phone,
+        data.employment_status,
+        data.job_title,
+        data.monthly_salary_min,
+        data.monthly_salary_max,
+        normalize_email(data.email),
+        normalize_phone(data.phone),
+    )
+
+    # If a concurrent insert of the same person commits while we run, our
+    # INSERT yields to it but the statement snapshot cannot see the
+    # winner yet; running again (new snapshot) returns it as "existing".
+    for _ in range(3):
+        row = await conn.fetchrow(CREATE_LEAD_SQL, *args)
         if row:
-            cur.close()
-            conn.close()
-            return row[0]
+            if row["status"] == "created":
+                # Drop a cached "not found" for this id.
+                await invalidate_leads(conn, [row["lead_id"]])
+            return row["status"], row["lead_id"]
 
-    cur.close()
-    conn.close()
-    return None
+    raise RuntimeError(f"Could not create or find lead {data.lead_id}")
 
 
 # -------------------------------------------------
-# Create new lead
-# RETURNS lead_id
+# Bulk intake: COPY into a staging table, dedup in SQL
+# RETURNS one (row_no, status, lead_id) per staged row
 # -------------------------------------------------
-def create_lead(data):
-    conn = get_db_connection()
-    cur = conn.cursor()
+BULK_COLUMNS = [
+    "row_no",
+    "lead_id",
+    "first_name",
+    "last_name",
+    "full_name",
+    "email",
+    "phone",
+    "employment_status",
+    "job_title",
+    "monthly_salary_min",
+    "monthly_salary_max",
+    "email_norm",
+    "phone_norm",
+]
 
-    cur.execute(
-        """
-        INSERT INTO leads (
-            lead_id,
-            first_name,
-            last_name,
-            full_name,
-            email,
-            phone,
-            employment_status,
-            job_title,
-            monthly_salary_min,
-            monthly_salary_max,
-            crm_synced,
-            task_created
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, false, false)
-        RETURNING lead_id
-        """,
-        (
-            data.lead_id,
-            data.first_name,
-            data.last_name,
-            data.full_name,
-            data.email,
-            data.phone,
-            data.employment_status,
-            data.job_title,
-            data.monthly_salary_min,
-            data.monthly_salary_max,
-        ),
+
+def bulk_record(row_no: int, data):
+    """Staging-table tuple for one validated `LeadCreate`."""
+    return (
+        row_no,
+        data.lead_id,
+        data.first_name,
+        data.last_name,
+        data.full_name,
+        data.email,
+        data.phone,
+        data.employment_status,
+        data.job_title,
+        data.monthly_salary_min,
+        data.monthly_salary_max,
+        normalize_email(data.email),
+        normalize_phone(data.phone),
     )
 
-    lead_id = cur.fetchone()[0]
-    conn.commit()
-    cur.close()
-    conn.close()
 
-    return lead_id
+@timed_query
+async def bulk_create_leads(conn, records):
+    if not records:
+        return []
 
+    async with conn.transaction():
+        await conn.execute("""
+            CREATE TEMP TABLE lead_staging (
+                row_no             INTEGER,
+                lead_id            TEXT,
+                first_name         TEXT,
+                last_name          TEXT,
+                full_name          TEXT,
+                email              TEXT,
+                phone              TEXT,
+                employment_status  TEXT,
+                job_title          TEXT,
+                monthly_salary_min DOUBLE PRECISION,
+                monthly_salary_max DOUBLE PRECISION,
+                email_norm         TEXT,
+                phone_norm         TEXT
+            ) ON COMMIT DROP
+        """)
+        await conn.copy_records_to_table(
+            "lead_staging", records=records, columns=BULK_COLUMNS
+        )
 
-# -------------------------------------------------
-# Get leads NOT synced to CRM
-# -------------------------------------------------
-def get_unsynced_leads():
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+        # Same arbitration as create_lead: rows that collide with an
+        # existing lead, or with an earlier row of this file, are skipped.
+        created = await conn.fetch("""
+            WITH ins AS (
+                INSERT INTO leads (
+                    lead_id,
+                    first_name,
+                    last_name,
+                    full_name,
+                    email,
+                    phone,
+                    employment_status,
+                    job_title,
+                    monthly_salary_min,
+                    monthly_salary_max,
+                    email_norm,
+                    phone_norm,
+                    crm_synced,
+                    task_created
+                )
                 SELECT
                     lead_id,
                     first_name,
                     last_name,
+                    full_name,
                     email,
                     phone,
-                    city,
-                    country,
                     employment_status,
                     job_title,
-                    monthly_salary_min
-                FROM leads
-                WHERE crm_synced = FALSE
-            """)
-            cols = [d[0] for d in cur.description]
-            rows = cur.fetchall()
+                    monthly_salary_min,
+                    monthly_salary_max,
+                    email_norm,
+                    phone_norm,
+                    false,
+                    false
+                FROM lead_staging
+                ORDER BY row_no
+                ON CONFLICT DO NOTHING
+                RETURNING lead_id, email_norm, phone_norm
+            ),
+            outbox AS (
+                INSERT INTO crm_outbox (lead_id)
+                SELECT lead_id FROM ins
+            )
+            -- Back to the staged row that was inserted: a file may repeat
+            -- a lead_id, but only the row with these exact keys got in
+            -- (an identical earlier row would have been inserted instead).
+            SELECT DISTINCT ON (ins.lead_id) s.row_no, ins.lead_id
+            FROM ins
+            JOIN lead_staging s
+              ON s.lead_id = ins.lead_id
+             AND s.email_norm IS NOT DISTINCT FROM ins.email_norm
+             AND s.phone_norm IS NOT DISTINCT FROM ins.phone_norm
+            ORDER BY ins.lead_id, s.row_no
+        """)
+
+        matches = await conn.fetch("""
+            SELECT s.row_no, s.lead_id, m.lead_id AS matched_lead_id
+            FROM lead_staging s
+            LEFT JOIN LATERAL (
+                SELECT l.lead_id
+                FROM leads l
+                WHERE l.lead_id = s.lead_id
+                   OR l.email_norm = s.email_norm
+                   OR l.phone_norm = s.phone_norm
+                ORDER BY (l.email_norm = s.email_norm) IS TRUE DESC,
+                         (l.phone_norm = s.phone_norm) IS TRUE DESC
+                LIMIT 1
+            ) m ON TRUE
+            ORDER BY s.row_no
+        """)
 
-    return [dict(zip(cols, row)) for row in rows]
+        if created:
+            # One wake-up for the whole chunk; workers drain the outbox.
+            await conn.execute("SELECT pg_notify($1, 'bulk')", OUTBOX_CHANNEL)
+
+    # After commit: drop cached "not found" entries for the new ids.
+    await invalidate_leads(conn, [r["lead_id"] for r in created])
+
+    # Rows that inserted a lead are "created"; every other row duplicated
+    # something.
+    created_rows = {r["row_no"]: r["lead_id"] for r in created}
+    results = []
+    for m in matches:
+        if m["row_no"] in created_rows:
+            results.append((m["row_no"], "created", created_rows[m["row_no"]]))
+        else:
+            results.append((m["row_no"], "existing", m["matched_lead_id"]))
+
+    return results
 
 
 # -------------------------------------------------
-# Mark lead as CRM-synced
+# Get leads NOT synced to CRM
 # -------------------------------------------------
-def mark_lead_crm_synced(lead_id: str, crm_person_id: str):
-    conn = get_db_connection()
-    cur = conn.cursor()
+@timed_query
+async def get_unsynced_leads(conn):
+    rows = await conn.fetch("""
+        SELECT
+            lead_id,
+            first_name,
+            last_name,
+            email,
+            phone,
+            city,
+            country,
+            employment_status,
+            job_title,
+            monthly_salary_min,
+            current_credit
+        FROM leads
+        WHERE crm_synced = FALSE
+    """)
 
-    cur.execute(
-        """
+    return [dict(row) for row in rows]
+
+
+# -------------------------------------------------
+# Mark many leads as CRM-synced (one set-based UPDATE)
+# -------------------------------------------------
+@timed_query
+async def mark_leads_crm_synced(conn, results):
+    """
+    `results` is a list of (lead_id, crm_person_id, payload_hash) triples;
+    the hash is what incremental sync compares against next time. Callers
+    run `invalidate_leads` once their transaction has committed.
+    """
+    if not results:
+        return
+
+    values = ", ".join(
+        f"(${3 * i + 1}, ${3 * i + 2}, ${3 * i + 3})" for i in range(len(results))
+    )
+    args = [v for triple in results for v in triple]
+
+    await conn.execute(
+        f"""
         UPDATE leads
         SET
             crm_synced = TRUE,
-            crm_person_id = %s,
+            crm_person_id = v.crm_person_id,
+            crm_payload_hash = v.crm_payload_hash,
             updated_at = now()
-        WHERE lead_id = %s
+        FROM (VALUES {values}) AS v(lead_id, crm_person_id, crm_payload_hash)
+        WHERE leads.lead_id = v.lead_id
         """,
-        (crm_person_id, lead_id)
+        *args,
     )
 
-    conn.commit()
-    cur.close()
-    conn.close()
+
+# -------------------------------------------------
+# Incremental sync: watermark + changed-lead scan
+# -------------------------------------------------
+@timed_query
+async def get_sync_watermark(conn, name: str):
+    return await conn.fetchval(
+        "SELECT watermark FROM crm_sync_state WHERE name = $1", name
+    )
+
+
+@timed_query
+async def set_sync_watermark(conn, name: str, watermark):
+    await conn.execute(
+        """
+        INSERT INTO crm_sync_state (name, watermark)
+        VALUES ($1, $2)
+        ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark
+        """,
+        name,
+        watermark,
+    )
+
+
+_CHANGED_LEAD_COLUMNS = """
+    l.lead_id,
+    l.first_name,
+    l.last_name,
+    l.email,
+    l.job_title,
+    l.current_credit,
+    l.crm_person_id,
+    l.crm_payload_hash,
+    l.updated_at
+"""
+
+
+@timed_query
+async def get_leads_changed_since(conn, since, after=None, limit: int = 1000):
+    """
+    One keyset page of synced leads with `updated_at >= since`, oldest
+    first, starting after the `(updated_at, lead_id)` key `after`.
+    Only the columns that feed the Twenty person payload are read.
+    """
+    after_ts, after_id = after if after is not None else (since, "")
+    rows = await conn.fetch(
+        f"""
+        SELECT {_CHANGED_LEAD_COLUMNS}
+        FROM leads l
+        WHERE l.crm_synced
+          AND l.updated_at >= $1
+          AND (l.updated_at, l.lead_id) > ($2, $3)
+        ORDER BY l.updated_at, l.lead_id
+        LIMIT $4
+        """,
+        since,
+        after_ts,
+        after_id,
+        limit,
+    )
+
+    return [dict(row) for row in rows]
+
+
+@timed_query
+async def get_due_sync_failures(conn, limit: int = 1000):
+    """Synced leads whose last change push failed and is due for a retry."""
+    rows = await conn.fetch(
+        f"""
+        SELECT {_CHANGED_LEAD_COLUMNS}
+        FROM crm_sync_failures f
+        JOIN leads l ON l.lead_id = f.lead_id
+        WHERE f.status = 'retry'
+          AND f.next_attempt_at <= now()
+          AND l.crm_synced
+        ORDER BY f.next_attempt_at
+        LIMIT $1
+        """,
+        limit,
+    )
+
+    return [dict(row) for row in rows]
+
+
+# Attempts so far for this edit: a newer edit of the lead starts over.
+_FAILURE_ATTEMPTS = (
+    "CASE WHEN f.lead_updated_at = EXCLUDED.lead_updated_at "
+    "THEN f.attempts + 1 ELSE 1 END"
+)
+
+
+@timed_query
+async def record_sync_failures(conn, failures, max_attempts: int,
+                               backoff_base: float, backoff_max: float):
+    """
+    Record a failed push for each (lead_id, updated_at, error) triple and
+    schedule the retry exponentially; past `max_attempts` the row goes
+    'dead' until the lead is edited again.
+    """
+    if not failures:
+        return
+
+    lead_ids, updated_ats, errors = zip(*failures)
+    await conn.execute(
+        f"""
+        INSERT INTO crm_sync_failures AS f
+            (lead_id, lead_updated_at, status, attempts, next_attempt_at, last_error)
+        SELECT
+            v.lead_id,
+            v.updated_at,
+            CASE WHEN $4::int <= 1 THEN 'dead' ELSE 'retry' END,
+            1,
+            now() + make_interval(secs => least($6::float8, $5::float8)),
+            v.error
+        FROM unnest($1::text[], $2::timestamptz[], $3::text[]) AS v(lead_id, updated_at, error)
+        ON CONFLICT (lead_id) DO UPDATE SET
+            lead_updated_at = EXCLUDED.lead_updated_at,
+            attempts = {_FAILURE_ATTEMPTS},
+            status = CASE WHEN {_FAILURE_ATTEMPTS} >= $4::int THEN 'dead' ELSE 'retry' END,
+            next_attempt_at = now() + make_interval(
+                secs => least($6::float8, $5::float8 * power(2, {_FAILURE_ATTEMPTS} - 1))
+            ),
+            last_error = EXCLUDED.last_error,
+            updated_at = now()
+        """,
+        list(lead_ids),
+        list(updated_ats),
+        list(errors),
+        max_attempts,
+        backoff_base,
+        backoff_max,
+    )
+
+
+@timed_query
+async def clear_sync_failures(conn, lead_ids):
+    if not lead_ids:
+        return
+
+    await conn.execute(
+        "DELETE FROM crm_sync_failures WHERE lead_id = ANY($1::text[])",
+        list(lead_ids),
+    )
 
 
 # -------------------------------------------------
-# Search leads
+# CRM outbox (consumed by app/worker.py)
 # -------------------------------------------------
-def search_leads(phone=None, email=None, name=None):
-    conn = get_db_connection()
-    cur = conn.cursor()
+@timed_query
+async def claim_outbox_batch(conn, limit: int, lease_seconds: float, max_attempts: int):
+    """
+    Lease up to `limit` due outbox rows to the caller for `lease_seconds`.
 
-    cur.execute(
+    Each statement commits on its own, so no transaction (and no row
+    lock) is held while the caller talks to Twenty. SKIP LOCKED lets any
+    number of workers claim disjoint rows without waiting on each other.
+    Rows whose lease expired, because their worker died mid-batch, go
+    back to 'pending' first and count as a failed attempt.
+    """
+    await conn.execute(
         """
+        UPDATE crm_outbox
+        SET
+            attempts = attempts + 1,
+            last_error = 'lease expired',
+            locked_until = NULL,
+            status = CASE WHEN attempts + 1 >= $1::int THEN 'dead' ELSE 'pending' END
+        WHERE status = 'in_progress'
+          AND locked_until < now()
+        """,
+        max_attempts,
+    )
+
+    rows = await conn.fetch(
+        """
+        WITH claimed AS (
+            UPDATE crm_outbox o
+            SET status = 'in_progress',
+                locked_until = now() + make_interval(secs => $2::float8)
+            WHERE o.id IN (
+                SELECT o2.id
+                FROM crm_outbox o2
+                JOIN leads l2 ON l2.lead_id = o2.lead_id
+                WHERE o2.status = 'pending'
+                  AND o2.next_attempt_at <= now()
+                ORDER BY o2.next_attempt_at, o2.id
+                LIMIT $1
+                FOR UPDATE OF o2 SKIP LOCKED
+            )
+            RETURNING o.id, o.attempts, o.lead_id
+        )
+        SELECT
+            c.id AS outbox_id,
+            c.attempts,
+            l.lead_id,
+            l.first_name,
+            l.last_name,
+            l.email,
+            l.phone,
+            l.city,
+            l.country,
+            l.employment_status,
+            l.job_title,
+            l.monthly_salary_min,
+            l.current_credit,
+            l.crm_synced
+        FROM claimed c
+        JOIN leads l ON l.lead_id = c.lead_id
+        """,
+        limit,
+        lease_seconds,
+    )
+
+    return [dict(row) for row in rows]
+
+
+@timed_query
+async def complete_outbox_entries(conn, outbox_ids):
+    if not outbox_ids:
+        return
+
+    await conn.execute(
+        """
+        UPDATE crm_outbox
+        SET status = 'done', processed_at = now(), last_error = NULL, locked_until = NULL
+        WHERE id = ANY($1::bigint[])
+        """,
+        list(outbox_ids),
+    )
+
+
+@timed_query
+async def fail_outbox_entries(conn, failures, max_attempts: int,
+                              backoff_base: float, backoff_max: float):
+    """
+    Record a failed attempt for each (outbox_id, error) pair and push the
+    next attempt out exponentially; rows past `max_attempts` go 'dead'.
+    """
+    if not failures:
+        return
+
+    values = ", ".join(
+        f"(${2 * i + 4}, ${2 * i + 5})" for i in range(len(failures))
+    )
+    args = [v for outbox_id, error in failures for v in (str(outbox_id), error)]
+
+    await conn.execute(
+        f"""
+        UPDATE crm_outbox o
+        SET
+            attempts = o.attempts + 1,
+            last_error = v.error,
+            locked_until = NULL,
+            status = CASE
+                WHEN o.attempts + 1 >= $1::int THEN 'dead'
+                ELSE 'pending'
+            END,
+            next_attempt_at = now() + make_interval(
+                secs => least($3::float8, $2::float8 * power(2, o.attempts))
+            )
+        FROM (VALUES {values}) AS v(outbox_id, error)
+        WHERE o.id = v.outbox_id::bigint
+        """,
+        max_attempts,
+        backoff_base,
+        backoff_max,
+        *args,
+    )
+
+
+# -------------------------------------------------
+# Search leads
+# Substring OR typo-tolerant match per field, answered from the pg_trgm
+# GIN indexes in migrations/003_leads_search_trgm.sql, ranked by
+# similarity. Only the filters actually given go into the SQL, so the
+# planner always sees indexable predicates.
+# -------------------------------------------------
+SEARCH_EMAIL_EXPR = "lower(email)"
+SEARCH_NAME_EXPR = "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))"
+SEARCH_PHONE_EXPR = r"regexp_replace(phone, '\D', '', 'g')"
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", r"\%").replace("_", r"\_")
+    return f"%{escaped}%"
+
+
+@timed_query
+async def search_leads(conn, phone=None, email=None, name=None, limit: int = 50):
+    where, scores, args = [], [], []
+
+    def arg(value):
+        args.append(value)
+        return f"${len(args)}"
+
+    if phone:
+        digits = "".join(c for c in phone if c.isdigit())
+        if not digits:
+            return []
+        p = arg(digits)
+        like = arg(_like_pattern(digits))
+        where.append(
+            f"({SEARCH_PHONE_EXPR} LIKE {like} OR {SEARCH_PHONE_EXPR} % {p})"
+        )
+        scores.append(f"similarity({SEARCH_PHONE_EXPR}, {p})")
+
+    if email:
+        term = email.strip().lower()
+        e = arg(term)
+        like = arg(_like_pattern(term))
+        where.append(
+            f"({SEARCH_EMAIL_EXPR} LIKE {like} OR {SEARCH_EMAIL_EXPR} % {e})"
+        )
+        scores.append(f"similarity({SEARCH_EMAIL_EXPR}, {e})")
+
+    if name:
+        term = " ".join(name.lower().split())
+        n = arg(term)
+        like = arg(_like_pattern(term))
+        # `<%` = best match of the term against any part of the full name,
+        # so "jon" still finds "John Smith".
+        where.append(
+            f"({SEARCH_NAME_EXPR} LIKE {like} OR {n} <% {SEARCH_NAME_EXPR})"
+        )
+        scores.append(f"word_similarity({n}, {SEARCH_NAME_EXPR})")
+
+    score = " + ".join(scores) if scores else "0"
+    rows = await conn.fetch(
+        f"""
         SELECT
             lead_id,
             first_name,
@@ -152,40 +647,22 @@ def search_leads(phone=None, email=None, name=None):
             phone,
             crm_synced
         FROM leads
-        WHERE
-            (%s IS NULL OR phone ILIKE %s)
-        AND (%s IS NULL OR email ILIKE %s)
-        AND (
-            %s IS NULL
-            OR first_name ILIKE %s
-            OR last_name ILIKE %s
-        )
-        ORDER BY created_at DESC
-        LIMIT 50
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {score} DESC, created_at DESC
+        LIMIT {arg(limit)}
         """,
-        (
-            phone, f"%{phone}%" if phone else None,
-            email, f"%{email}%" if email else None,
-            name, f"%{name}%", f"%{name}%"
-        )
+        *args,
     )
 
-    cols = [d[0] for d in cur.description]
-    rows = cur.fetchall()
-
-    cur.close()
-    conn.close()
-    return [dict(zip(cols, row)) for row in rows]
+    return [dict(row) for row in rows]
 
 
 # -------------------------------------------------
 # Get lead by BUSINESS lead_id (API-safe)
 # -------------------------------------------------
-def get_lead_by_id(lead_id: str):
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute(
+@timed_query
+async def get_lead_by_id(conn, lead_id: str):
+    row = await conn.fetchrow(
         """
         SELECT
             lead_id,
@@ -196,24 +673,114 @@ def get_lead_by_id(lead_id: str):
             crm_synced,
             created_at
         FROM leads
-        WHERE lead_id = %s
+        WHERE lead_id = $1
         """,
-        (lead_id,)
+        lead_id,
     )
 
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-
     if not row:
         return None
 
     return {
-        "lead_id": row[0],
-        "first_name": row[1],
-        "last_name": row[2],
-        "email": row[3],
-        "phone": row[4],
-        "crm_synced": row[5],
-        "created_at": row[6].isoformat() if row[6] else None,
+        "lead_id": row["lead_id"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "email": row["email"],
+        "phone": row["phone"],
+        "crm_synced": row["crm_synced"],
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
     }
+
+
+# -------------------------------------------------
+# Read-through cache in front of get_lead_by_id
+# -------------------------------------------------
+async def get_lead_by_id_cached(conn, lead_id: str):
+    lead = lead_cache.get(lead_id)
+    if lead is MISS:
+        # An invalidation landing during the read discards what we read.
+        generation = lead_cache.generation()
+        lead = await get_lead_by_id(conn, lead_id)
+        lead_cache.set(lead_id, lead, generation)
+    return dict(lead) if lead is not None else None
+
+
+async def invalidate_leads(conn, lead_ids):
+    """
+    Drop cached copies of `lead_ids` here and, with LEAD_CACHE_NOTIFY,
+    in every other process. Call it once the write has committed: a read
+    between the drop and the commit would cache the old row again.
+    """
+    if not lead_ids:
+        return
+
+    lead_cache.invalidate(lead_ids)
+    if LEAD_CACHE_NOTIFY:
+        await conn.execute(
+            "SELECT pg_notify($1, id) FROM unnest($2::text[]) AS id",
+            LEAD_CACHE_CHANNEL,
+            list(lead_ids),
+        )
+
+
+# -------------------------------------------------
+# List leads (minimal projection, keyset-paginated)
+# Newest first; (created_at, lead_id) is the cursor.
+#
+# The first page and later pages are separate statements: a single one
+# with "$1 IS NULL OR (created_at, lead_id) < ($1, $2)" gets a generic
+# plan once asyncpg has cached it, and the row comparison then stops
+# being an index condition, so deep pages re-read every newer row.
+# -------------------------------------------------
+LIST_LEADS_SQL = """
+    SELECT lead_id, email, crm_synced, created_at
+    FROM leads
+    ORDER BY created_at DESC, lead_id DESC
+"""
+
+LIST_LEADS_AFTER_SQL = """
+    SELECT lead_id, email, crm_synced, created_at
+    FROM leads
+    WHERE (created_at, lead_id) < ($1::timestamptz, $2::text)
+    ORDER BY created_at DESC, lead_id DESC
+"""
+
+
+def _lead_list_item(r):
+    return {
+        "lead_id": r["lead_id"],
+        "email": r["email"],
+        "crm_synced": r["crm_synced"],
+    }
+
+
+@timed_query
+async def list_leads_page(conn, limit: int, after=None):
+    """
+    One page of leads plus the key of its last row (None on the last
+    page). `after` is the (created_at, lead_id) key from the previous page.
+    """
+    if after is None:
+        rows = await conn.fetch(LIST_LEADS_SQL + " LIMIT $1", limit + 1)
+    else:
+        rows = await conn.fetch(LIST_LEADS_AFTER_SQL + " LIMIT $3", *after, limit + 1)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_key = (rows[-1]["created_at"], rows[-1]["lead_id"]) if has_more else None
+
+    return [_lead_list_item(r) for r in rows], next_key
+
+
+async def iter_leads(conn, after=None, prefetch: int = 1000):
+    """
+    Stream leads through a server-side cursor, `prefetch` rows per round
+    trip, so memory stays flat however large the table is. Must run
+    inside a transaction.
+    """
+    if after is None:
+        cursor = conn.cursor(LIST_LEADS_SQL, prefetch=prefetch)
+    else:
+        cursor = conn.cursor(LIST_LEADS_AFTER_SQL, *after, prefetch=prefetch)
+    async for r in cursor:
+        yield _lead_list_item(r)
@@ -0,0 +1,69 @@
+# app/normalize.py
+from typing import Optional
+
+# Dedup keys for leads. migrations/004_leads_dedup_keys.sql backfills
+# existing rows with the SQL equivalent of these rules; keep them in step.
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Last 10 digits (same rule as public/crm._normalize_phone)."""
+    if not phone:
+        return None
+    digits = "".join(c for c in str(phone) if c.isdigit())
+    return digits[-10:] if len(digits) >= 10 else None
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    return email.strip().lower() or None
+
+
+# -------------------------------------------------
+# Looser keys used only for near-duplicate linkage (app/linkage.py)
+# -------------------------------------------------
+GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+
+
+def canonical_email(email: Optional[str]) -> Optional[str]:
+    """
+    Mailbox identity: drops "+tag" suffixes and, for Gmail, dots in the
+    local part, so jsmith+cars@gmail.com == j.smith@gmail.com.
+    """
+    email = normalize_email(email)
+    if not email or "@" not in email:
+        return email
+
+    local, _, domain = email.rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in GMAIL_DOMAINS:
+        local = local.replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}" if local else None
+
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def soundex(word: Optional[str]) -> Optional[str]:
+    """American Soundex (e.g. Smith / Smyth -> S530)."""
+    letters = [c for c in (word or "").lower() if c.isalpha()]
+    if not letters:
+        return None
+
+    out = [letters[0].upper()]
+    last = _SOUNDEX_CODES.get(letters[0])
+    for c in letters[1:]:
+        code = _SOUNDEX_CODES.get(c)
+        if code and code != last:
+            out.append(code)
+        if c not in "hw":  # h/w do not separate equal codes
+            last = code
+    return "".join(out)[:4].ljust(4, "0")
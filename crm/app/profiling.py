@@ -0,0 +1,281 @@
+# app/profiling.py
+"""
+On-demand request profiling.
+
+A profiled request (PROFILE_HEADER carrying PROFILE_TOKEN, or sampled by
+PROFILE_SAMPLE_RATE) records a tree of timed spans: database operations,
+every Twenty call attempt and every LLM generation, with ids such as
+lead_id, person_id and member_id as attributes. The response carries `X-Profile-Id`; the
+tree is kept in memory for the last PROFILE_MAX_PROFILES requests and
+served as JSON or as folded stacks for flame-graph tools
+(flamegraph.pl, speedscope).
+
+Spans slower than PROFILE_SLOW_SPAN_MS are logged as one JSON line each
+on the `app.slow` logger.
+
+Outside a profiled request `span()` only reads a context variable, so
+the instrumentation stays in the hot paths. Tasks started inside a
+request inherit its context, so concurrent work nests under the span
+that was open when the task was created.
+"""
+import hmac
+import json
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    PROFILE_HEADER,
+    PROFILE_MAX_PROFILES,
+    PROFILE_MAX_SPANS,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_SLOW_SPAN_MS,
+    PROFILE_TOKEN,
+)
+
+slow_logger = logging.getLogger("app.slow")
+
+_current: ContextVar[Optional["Span"]] = ContextVar("profile_span", default=None)
+
+# Finished profiles, oldest first.
+_profiles: "OrderedDict[str, Profile]" = OrderedDict()
+
+_HEADER = PROFILE_HEADER.lower().encode()
+# Never profile the endpoints that serve profiles and metrics.
+_SKIP_PREFIXES = ("/profiles", "/metrics")
+
+
+class Profile:
+    def __init__(self, profile_id: str, max_spans: int):
+        self.id = profile_id
+        self.max_spans = max_spans
+        self.span_count = 0
+        self.dropped = 0
+        self.created_at = time.time()
+        self.root: Optional[Span] = None
+
+
+class Span:
+    __slots__ = ("name", "attrs", "profile", "parent", "children", "start", "end")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], profile: Profile, parent: Optional["Span"]):
+        self.name = name
+        self.attrs = attrs
+        self.profile = profile
+        self.parent = parent
+        self.children: List[Span] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def path(self) -> List[str]:
+        names, node = [], self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return names[::-1]
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+class span:
+    """
+    Time a block as a child of the current span (`with` or `async with`).
+    A no-op when the request is not being profiled.
+    """
+
+    __slots__ = ("name", "attrs", "_span", "_token")
+
+    def __init__(self, name: str, **attrs: Any):
+        self.name = name
+        self.attrs = attrs
+        self._span: Optional[Span] = None
+
+    def set(self, **attrs: Any):
+        if self._span is not None:
+            self._span.attrs.update(attrs)
+
+    def __enter__(self) -> "span":
+        parent = _current.get()
+        if parent is None:
+            return self
+        profile = parent.profile
+        if profile.span_count >= profile.max_spans:
+            profile.dropped += 1
+            return self
+        profile.span_count += 1
+        self._span = Span(self.name, self.attrs, profile, parent)
+        parent.children.append(self._span)
+        self._token = _current.set(self._span)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        s = self._span
+        if s is None:
+            return False
+        s.end = time.perf_counter()
+        _current.reset(self._token)
+        if exc_type is not None:
+            s.attrs["error"] = exc_type.__name__
+        _log_if_slow(s)
+        return False
+
+    async def __aenter__(self) -> "span":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def _log_if_slow(s: Span):
+    duration_ms = s.duration * 1000
+    if duration_ms < PROFILE_SLOW_SPAN_MS:
+        return
+    slow_logger.warning(json.dumps({
+        "profile_id": s.profile.id,
+        "span": s.name,
+        "path": s.path(),
+        "duration_ms": round(duration_ms, 3),
+        "attrs": s.attrs,
+    }, default=str))
+
+
+# -------------------------------------------------
+# STORE / EXPORT
+# -------------------------------------------------
+def _store(profile: Profile):
+    _profiles[profile.id] = profile
+    while len(_profiles) > max(1, PROFILE_MAX_PROFILES):
+        _profiles.popitem(last=False)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Most recent first."""
+    return [
+        {
+            "profile_id": p.id,
+            "name": p.root.name,
+            "status": p.root.attrs.get("status"),
+            "duration_ms": round(p.root.duration * 1000, 3),
+            "spans": p.span_count,
+            "created_at": p.created_at,
+        }
+        for p in reversed(_profiles.values())
+    ]
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    profile = _profiles.get(profile_id)
+    if profile is None:
+        return None
+    return {
+        "profile_id": profile.id,
+        "created_at": profile.created_at,
+        "spans": profile.span_count,
+        "dropped_spans": profile.dropped,
+        "root": profile.root.to_dict(profile.root.start),
+    }
+
+
+def folded_stacks(profile_id: str) -> Optional[str]:
+    """
+    One `frame;frame;frame microseconds` line per span, weighted by self
+    time (duration minus children). Children that ran concurrently can
+    add up to more than their parent; the parent's self time is then 0.
+    """
+    profile = _profiles.get(profile_id)
+    if profile is None:
+        return None
+
+    lines: List[str] = []
+
+    def walk(s: Span, prefix: str):
+        frame = s.name.replace(";", ",")
+        stack = f"{prefix};{frame}" if prefix else frame
+        children = sum(child.duration for child in s.children)
+        self_us = int(max(0.0, s.duration - children) * 1_000_000)
+        if self_us:
+            lines.append(f"{stack} {self_us}")
+        for child in s.children:
+            walk(child, stack)
+
+    walk(profile.root, "")
+    return "\n".join(lines) + "\n"
+
+
+def check_token(value: Optional[str]) -> bool:
+    """
+    Whether a request may start or read profiles. Profiles carry lead,
+    person and member ids, so without PROFILE_TOKEN nobody may.
+    """
+    if not PROFILE_TOKEN or value is None:
+        return False
+    # Header values arrive decoded as latin-1: compare the raw bytes.
+    return hmac.compare_digest(value.encode("latin-1"), PROFILE_TOKEN.encode("utf-8"))
+
+
+# -------------------------------------------------
+# ASGI MIDDLEWARE
+# -------------------------------------------------
+def _should_profile(scope) -> bool:
+    if scope["path"].startswith(_SKIP_PREFIXES):
+        return False
+    for name, value in scope.get("headers", ()):
+        if name == _HEADER:
+            return check_token(value.decode("latin-1"))
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class ProfilingMiddleware:
+    """Opens the root span of a profiled request and adds `X-Profile-Id`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(uuid.uuid4().hex, PROFILE_MAX_SPANS)
+        root = Span(f"{scope['method']} {scope['path']}", {}, profile, None)
+        profile.root = root
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.attrs["status"] = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-profile-id", profile.id.encode()),
+                ]
+            await send(message)
+
+        token = _current.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            root.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            root.end = time.perf_counter()
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                root.name = f"{scope['method']} {route.path}"
+                root.attrs["path"] = scope["path"]
+            _store(profile)
+            _log_if_slow(root)
@@ -0,0 +1,313 @@
+# app/sync.py
+import asyncio
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import (
+    SYNC_CONCURRENCY,
+    SYNC_BATCH_SIZE,
+    SYNC_WRITEBACK_CHUNK,
+    SYNC_CHANGES_SCAN_SIZE,
+    SYNC_CHANGES_OVERLAP_SECONDS,
+    SYNC_CHANGES_MAX_ATTEMPTS,
+    SYNC_CHANGES_BACKOFF_BASE_SECONDS,
+    SYNC_CHANGES_BACKOFF_MAX_SECONDS,
+)
+from app.crm import (
+    person_payload_hash,
+    update_person_in_crm,
+    upsert_person_in_crm,
+    upsert_people_in_crm,
+)
+from app.models import (
+    clear_sync_failures,
+    get_due_sync_failures,
+    get_leads_changed_since,
+    get_sync_watermark,
+    invalidate_leads,
+    mark_leads_crm_synced,
+    record_sync_failures,
+    set_sync_watermark,
+)
+from app.profiling import span
+
+# crm_sync_state row and advisory lock key for the changed-lead scan
+CHANGES_WATERMARK = "leads_changes"
+
+
+# -------------------------------------------------
+# CHUNKED WRITE-BACK OF SYNC RESULTS
+# -------------------------------------------------
+class SyncResultWriter:
+    """
+    Buffers (lead_id, crm_person_id, payload_hash) triples and writes them back with one
+    multi-row UPDATE per `chunk_size` leads, each in its own short
+    transaction. A crash loses at most one unflushed chunk; those leads
+    are simply upserted again on the next run.
+    """
+
+    def __init__(self, pool, synced: List[str], failed: List[Dict[str, Any]],
+                 chunk_size: int = SYNC_WRITEBACK_CHUNK):
+        self.pool = pool
+        self.synced = synced
+        self.failed = failed
+        self.chunk_size = max(1, chunk_size)
+        self._buffer: List[Tuple[str, str, Optional[str]]] = []
+        self._lock = asyncio.Lock()
+
+    async def add(self, lead_id: str, crm_person_id: str, payload_hash: Optional[str] = None):
+        self._buffer.append((lead_id, crm_person_id, payload_hash))
+        if len(self._buffer) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            chunk, self._buffer = self._buffer, []
+            if not chunk:
+                return
+
+            lead_ids = [lead_id for lead_id, _, _ in chunk]
+            committed = False
+            try:
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        await mark_leads_crm_synced(conn, chunk)
+                    committed = True
+                    await invalidate_leads(conn, lead_ids)
+            except Exception as e:
+                if not committed:
+                    self.failed.extend(
+                        {"lead_id": lead_id, "error": f"DB write-back failed: {e}"}
+                        for lead_id in lead_ids
+                    )
+                    return
+                # Written; only the cache broadcast failed, copies expire by TTL.
+
+            self.synced.extend(lead_ids)
+
+
+# -------------------------------------------------
+# ONE BATCH → TWENTY (no DB writes)
+# -------------------------------------------------
+async def upsert_lead_batch(
+    batch: List[Dict[str, Any]],
+) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+    """
+    Upsert one batch and return `({lead_id: crm_person_id}, failed)`.
+
+    Tries a single batch request first; if Twenty rejects it, retries
+    lead by lead so only the bad record ends up in `failed`.
+    """
+    if len(batch) > 1:
+        try:
+            return await upsert_people_in_crm(batch), []
+        except Exception:
+            pass
+
+    person_ids, failed = {}, []
+    for lead in batch:
+        try:
+            with span("sync lead", lead_id=lead["lead_id"]):
+                person_ids[lead["lead_id"]] = await upsert_person_in_crm(lead)
+        except Exception as e:
+            failed.append({
+                "lead_id": lead["lead_id"],
+                "error": str(e),
+            })
+
+    return person_ids, failed
+
+
+# -------------------------------------------------
+# CONCURRENT LEAD → TWENTY SYNC
+# -------------------------------------------------
+async def sync_leads_to_crm(
+    pool,
+    leads: List[Dict[str, Any]],
+    concurrency: int = SYNC_CONCURRENCY,
+    batch_size: int = SYNC_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Upsert `leads` into Twenty in batches of `batch_size`, with up to
+    `concurrency` batches in flight.
+
+    Outbound calls are throttled by the shared Twenty rate limiter, so
+    raising concurrency only helps until that cap is reached. A failing
+    lead is recorded in `failed` and never stops the others.
+    """
+    synced, failed = [], []
+    writer = SyncResultWriter(pool, synced, failed)
+    batch_size = max(1, batch_size)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for lead in leads:
+        if not lead.get("email"):
+            failed.append({
+                "lead_id": lead["lead_id"],
+                "error": "Email is required for CRM sync",
+            })
+    sendable = [lead for lead in leads if lead.get("email")]
+    for i in range(0, len(sendable), batch_size):
+        queue.put_nowait(sendable[i:i + batch_size])
+
+    async def sync_batch(batch: List[Dict[str, Any]]):
+        with span("sync batch", size=len(batch), first_lead_id=batch[0]["lead_id"]):
+            person_ids, batch_failed = await upsert_lead_batch(batch)
+        failed.extend(batch_failed)
+        for lead in batch:
+            if lead["lead_id"] in person_ids:
+                await writer.add(
+                    lead["lead_id"],
+                    person_ids[lead["lead_id"]],
+                    person_payload_hash(lead),
+                )
+
+    async def worker():
+        while True:
+            try:
+                batch = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await sync_batch(batch)
+
+    workers = max(1, min(concurrency, queue.qsize()))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    await writer.flush()
+
+    return {
+        "total": len(leads),
+        "synced_count": len(synced),
+        "failed_count": len(failed),
+        "synced": synced,
+        "failed": failed,
+    }
+
+
+# -------------------------------------------------
+# INCREMENTAL SYNC OF EDITED LEADS
+# -------------------------------------------------
+async def sync_changed_leads(
+    pool,
+    concurrency: int = SYNC_CONCURRENCY,
+    scan_size: int = SYNC_CHANGES_SCAN_SIZE,
+    overlap_seconds: float = SYNC_CHANGES_OVERLAP_SECONDS,
+) -> Dict[str, Any]:
+    """
+    Push edits of already-synced leads to Twenty.
+
+    Scans leads whose `updated_at` passed the stored watermark (minus
+    `overlap_seconds`, for transactions that committed late), re-hashes
+    their person payload and PATCHes `/people/{crm_person_id}` only where
+    the hash differs from the one stored at the last sync.
+
+    A lead that fails is recorded in `crm_sync_failures` and retried by
+    later runs with backoff, up to SYNC_CHANGES_MAX_ATTEMPTS; the
+    watermark always advances to the newest lead scanned, so one bad
+    lead never makes every run re-read everything behind it.
+
+    Only one scan runs at a time across all processes (advisory lock);
+    a concurrent call returns `{"skipped": True}`.
+    """
+    synced, failed = [], []
+    writer = SyncResultWriter(pool, synced, failed)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    scanned = unchanged = 0
+    updated_at: Dict[str, Any] = {}
+    resolved: List[str] = []
+
+    async def push(lead: Dict[str, Any], payload_hash: str):
+        async with sem:
+            try:
+                with span("sync push", lead_id=lead["lead_id"],
+                          crm_person_id=lead["crm_person_id"]):
+                    if lead["crm_person_id"]:
+                        person_id = await update_person_in_crm(lead["crm_person_id"], lead)
+                    else:
+                        person_id = await upsert_person_in_crm(lead)
+            except Exception as e:
+                failed.append({"lead_id": lead["lead_id"], "error": str(e)})
+                return
+        await writer.add(lead["lead_id"], person_id, payload_hash)
+
+    async def process(leads: List[Dict[str, Any]], retry: bool):
+        nonlocal unchanged
+        pushes = []
+        for lead in leads:
+            updated_at[lead["lead_id"]] = lead["updated_at"]
+            try:
+                payload_hash = person_payload_hash(lead)
+            except ValueError as e:
+                failed.append({"lead_id": lead["lead_id"], "error": str(e)})
+                continue
+            if payload_hash == lead["crm_payload_hash"]:
+                unchanged += 1
+                if retry:
+                    resolved.append(lead["lead_id"])
+                continue
+            pushes.append(push(lead, payload_hash))
+
+        await asyncio.gather(*pushes)
+        await writer.flush()
+
+    async with pool.acquire() as lock_conn:
+        got_lock = await lock_conn.fetchval(
+            "SELECT pg_try_advisory_lock(hashtext($1))", CHANGES_WATERMARK
+        )
+        if not got_lock:
+            return {"skipped": True}
+
+        try:
+            watermark = await get_sync_watermark(lock_conn, CHANGES_WATERMARK)
+            if watermark is None:
+                raise RuntimeError("crm_sync_state is missing; apply migrations/006")
+            since = watermark - timedelta(seconds=overlap_seconds)
+            high = watermark
+
+            # Earlier failures first. They read the lead as it is now, so
+            # the scan below skips them.
+            async with pool.acquire() as conn:
+                retries = await get_due_sync_failures(conn, scan_size)
+            await process(retries, retry=True)
+            retried = set(updated_at)
+
+            after = None
+            while True:
+                async with pool.acquire() as conn:
+                    leads = await get_leads_changed_since(conn, since, after, scan_size)
+                if not leads:
+                    break
+
+                scanned += len(leads)
+                after = (leads[-1]["updated_at"], leads[-1]["lead_id"])
+                high = max(high, leads[-1]["updated_at"])
+                await process([l for l in leads if l["lead_id"] not in retried], retry=False)
+
+            # Validation, Twenty and write-back failures alike.
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await clear_sync_failures(conn, synced + resolved)
+                    await record_sync_failures(
+                        conn,
+                        [(f["lead_id"], updated_at[f["lead_id"]], f["error"]) for f in failed],
+                        SYNC_CHANGES_MAX_ATTEMPTS,
+                        SYNC_CHANGES_BACKOFF_BASE_SECONDS,
+                        SYNC_CHANGES_BACKOFF_MAX_SECONDS,
+                    )
+
+            if high > watermark:
+                await set_sync_watermark(lock_conn, CHANGES_WATERMARK, high)
+        finally:
+            await lock_conn.execute(
+                "SELECT pg_advisory_unlock(hashtext($1))", CHANGES_WATERMARK
+            )
+
+    return {
+        "total": scanned,
+        "retried_count": len(retries),
+        "unchanged_count": unchanged,
+        "synced_count": len(synced),
+        "failed_count": len(failed),
+        "synced": synced,
+        "failed": failed,
+        "watermark": high.isoformat(),
+    }
@@ -0,0 +1,210 @@
+# app/twenty.py
+import asyncio
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import (
+    TWENTY_CONNECT_TIMEOUT,
+    TWENTY_READ_TIMEOUT,
+    TWENTY_MAX_RETRIES,
+    TWENTY_BACKOFF_BASE_SECONDS,
+    TWENTY_BACKOFF_MAX_SECONDS,
+    TWENTY_MAX_CONNECTIONS,
+    TWENTY_RATE_LIMIT_RPS,
+    TWENTY_RATE_LIMIT_BURST,
+    TWENTY_RATE_LIMIT_PROCESSES,
+)
+from app.metrics import TWENTY_RATE_LIMIT_WAIT_SECONDS, TWENTY_REQUEST_SECONDS
+from app.profiling import span
+
+# Statuses worth retrying for ANY method: Twenty refused the request
+# without acting on it (rate limit / maintenance).
+RETRY_STATUSES = {429, 503}
+
+# Extra statuses and errors that are only safe to retry for idempotent
+# requests: a gateway 502/504 or a dropped connection says nothing about
+# whether Twenty already created the task. Callers whose POST is safe to
+# repeat (the people upserts) opt in with `idempotent=True`.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+IDEMPOTENT_RETRY_STATUSES = {500, 502, 504}
+
+# Record ids in paths collapse to one metrics series per endpoint.
+_ID_SEGMENT = re.compile(r"/[0-9a-fA-F]{8}-[0-9a-fA-F-]{27,}")
+
+
+def _endpoint(path: str) -> str:
+    return _ID_SEGMENT.sub("/{id}", path.split("?", 1)[0])
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every coroutine in the process. Other
+    processes have their own; see TWENTY_RATE_LIMIT_PROCESSES.
+
+    `rate` tokens are added per second up to `burst`; each request takes
+    one. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+
+        # The lock makes waiters queue up in arrival order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class TwentyClient:
+    """
+    Single keep-alive HTTP client for the Twenty REST API.
+
+    Wraps one pooled `httpx.AsyncClient` and retries throttled or
+    transiently failing calls with jittered exponential backoff,
+    honouring `Retry-After` when Twenty sends it. All calls in the
+    process share this process's slice of TWENTY_RATE_LIMIT_RPS, so
+    together the processes stay under Twenty's rate limit.
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str]):
+        self.base_url = base_url
+        self.headers = headers
+        self.limiter = RateLimiter(
+            TWENTY_RATE_LIMIT_RPS / TWENTY_RATE_LIMIT_PROCESSES,
+            TWENTY_RATE_LIMIT_BURST // TWENTY_RATE_LIMIT_PROCESSES,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop.
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=httpx.Timeout(
+                    TWENTY_READ_TIMEOUT,
+                    connect=TWENTY_CONNECT_TIMEOUT,
+                ),
+                limits=httpx.Limits(
+                    max_connections=TWENTY_MAX_CONNECTIONS,
+                    max_keepalive_connections=TWENTY_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        idempotent: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        endpoint = _endpoint(path)
+
+        attempt = 0
+        while True:
+            # Retries count against the rate limit like any other call.
+            waited = time.perf_counter()
+            await self.limiter.acquire()
+            started = time.perf_counter()
+            TWENTY_RATE_LIMIT_WAIT_SECONDS.observe(started - waited)
+            attempt_span = span(
+                f"twenty {method} {endpoint}",
+                attempt=attempt,
+                rate_limit_wait_ms=round((started - waited) * 1000, 3),
+            )
+            try:
+                with attempt_span:
+                    r = await self.client.request(method, path, **kwargs)
+                    attempt_span.set(status=r.status_code)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                TWENTY_REQUEST_SECONDS.observe(time.perf_counter() - started, method, endpoint, "connect_error")
+                # Never reached Twenty: safe to retry for every method.
+                if attempt >= TWENTY_MAX_RETRIES:
+                    raise
+            except httpx.TransportError:
+                TWENTY_REQUEST_SECONDS.observe(time.perf_counter() - started, method, endpoint, "transport_error")
+                if not idempotent or attempt >= TWENTY_MAX_RETRIES:
+                    raise
+            else:
+                TWENTY_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, method, endpoint, str(r.status_code)
+                )
+                retryable = r.status_code in RETRY_STATUSES or (
+                    idempotent and r.status_code in IDEMPOTENT_RETRY_STATUSES
+                )
+                if not retryable or attempt >= TWENTY_MAX_RETRIES:
+                    return r
+
+                retry_after = _parse_retry_after(r.headers.get("Retry-After"))
+                if retry_after is not None:
+                    await asyncio.sleep(min(retry_after, TWENTY_BACKOFF_MAX_SECONDS))
+                    attempt += 1
+                    continue
+
+            await asyncio.sleep(_backoff_delay(attempt))
+            attempt += 1
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+
+def _backoff_delay(attempt: int) -> float:
+    # "Full jitter": spreads retries from many concurrent callers.
+    ceiling = min(TWENTY_BACKOFF_MAX_SECONDS, TWENTY_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,96 @@
+# app/warmup.py
+"""
+Startup warm-up for the API (run from the lifespan in app/main.py).
+
+Without it the first requests after a deploy pay for opening database
+connections, the TLS handshake to Twenty, the workspace member list and
+loading the model in Ollama. The required part (config check, DB pool)
+runs before the app accepts requests and fails startup if it fails; the
+slow outbound part runs in the background and GET /ready answers 503
+until it has finished.
+
+A failing outbound step is logged and reported but does not block
+readiness: Twenty calls retry on their own and notes fall back to the
+static template while Ollama is down.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.config import WARMUP_OLLAMA, WARMUP_TIMEOUT_SECONDS, validate_config
+from app.crm import get_workspace_members
+from app.db import init_pool
+from app.llm import preload_model
+
+logger = logging.getLogger("app.warmup")
+
+
+class WarmUp:
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None
+
+    async def _step(self, name: str, coro, required: bool = False):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(coro, WARMUP_TIMEOUT_SECONDS)
+        except Exception as e:
+            self.steps[name] = {
+                "ok": False,
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": f"{type(e).__name__}: {e}",
+            }
+            if required:
+                raise
+            logger.warning("warm-up step %s failed: %s", name, self.steps[name]["error"])
+            return
+        self.steps[name] = {"ok": True, "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    async def start(self):
+        """Required steps inline, outbound ones in the background."""
+        self.started_at = time.time()
+        validate_config()
+        await self._step("db_pool", _open_db_pool(), required=True)
+        self._task = asyncio.create_task(self._outbound())
+
+    async def _outbound(self):
+        steps = [self._step("twenty_reference_data", get_workspace_members())]
+        if WARMUP_OLLAMA:
+            steps.append(self._step("ollama_model", preload_model(WARMUP_TIMEOUT_SECONDS)))
+        await asyncio.gather(*steps)
+        self.finished_at = time.time()
+        logger.info("warm-up finished in %.1fs: %s", self.finished_at - self.started_at, self.steps)
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": self.steps,
+        }
+
+
+async def _open_db_pool():
+    # create_pool opens DB_POOL_MIN_SIZE connections; one round trip
+    # confirms the credentials and warms the server-side session.
+    pool = await init_pool()
+    async with pool.acquire() as conn:
+        await conn.fetchval("SELECT 1")
+
+
+warmup = WarmUp()
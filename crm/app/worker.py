@@ -0,0 +1,227 @@
+# app/worker.py
+"""
+Background CRM sync worker.
+
+    python -m app.worker
+
+Sleeps on LISTEN crm_outbox, wakes when `create_lead` commits, claims due
+outbox rows by leasing them (status 'in_progress' until locked_until) and
+pushes them to Twenty outside any transaction. Run as many processes as
+needed; they never claim the same row. A periodic poll also picks up
+retries whose backoff has expired, rows whose lease expired and any
+missed NOTIFY.
+
+Two side tasks run next to the outbox loop, so neither holds it up:
+every SYNC_CHANGES_INTERVAL_SECONDS one pushes edits of already-synced
+leads (app.sync.sync_changed_leads; only one process runs that scan at
+a time), and every MIRROR_POLL_SECONDS the other refreshes the local
+Twenty mirror (app.mirror), including the periodic full reload.
+"""
+import asyncio
+import logging
+import signal
+
+from app.config import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_BACKOFF_BASE_SECONDS,
+    OUTBOX_BACKOFF_MAX_SECONDS,
+    OUTBOX_LEASE_SECONDS,
+    SYNC_CHANGES_INTERVAL_SECONDS,
+    MIRROR_POLL_SECONDS,
+    validate_config,
+)
+from app.crm import person_payload_hash, twenty
+from app.db import init_pool, close_pool, get_db_connection
+from app.models import (
+    OUTBOX_CHANNEL,
+    claim_outbox_batch,
+    complete_outbox_entries,
+    fail_outbox_entries,
+    invalidate_leads,
+    mark_leads_crm_synced,
+)
+from app.mirror import refresh_mirror
+from app.sync import sync_changed_leads, upsert_lead_batch
+
+logger = logging.getLogger("app.worker")
+
+
+# -------------------------------------------------
+# ONE CLAIM → SYNC → RECORD CYCLE
+# -------------------------------------------------
+async def process_outbox_batch(pool, limit: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Claim and process up to `limit` outbox rows; returns how many were
+    claimed (0 means the queue is drained for now).
+
+    The claim and the bookkeeping are two short transactions; Twenty is
+    called in between with no connection held. If this worker dies
+    mid-batch, the rows come back once their OUTBOX_LEASE_SECONDS lease
+    expires.
+    """
+    async with pool.acquire() as conn:
+        rows = await claim_outbox_batch(conn, limit, OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS)
+    if not rows:
+        return 0
+
+    # Already pushed by POST /sync-crm: nothing left to do.
+    done_ids = [r["outbox_id"] for r in rows if r["crm_synced"]]
+    pending = [r for r in rows if not r["crm_synced"]]
+
+    # As in sync_leads_to_crm: one email-less lead would make Twenty reject
+    # the whole batch call and push every row onto the per-lead fallback.
+    failed = [
+        {"lead_id": r["lead_id"], "error": "Email is required for CRM sync"}
+        for r in pending
+        if not r.get("email")
+    ]
+    person_ids, batch_failed = await upsert_lead_batch([r for r in pending if r.get("email")])
+    failed.extend(batch_failed)
+
+    outbox_by_lead = {r["lead_id"]: r["outbox_id"] for r in pending}
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await mark_leads_crm_synced(
+                conn,
+                [
+                    (r["lead_id"], person_ids[r["lead_id"]], person_payload_hash(r))
+                    for r in pending
+                    if r["lead_id"] in person_ids
+                ],
+            )
+            await complete_outbox_entries(
+                conn,
+                done_ids + [outbox_by_lead[lead_id] for lead_id in person_ids],
+            )
+            await fail_outbox_entries(
+                conn,
+                [(outbox_by_lead[f["lead_id"]], f["error"]) for f in failed],
+                OUTBOX_MAX_ATTEMPTS,
+                OUTBOX_BACKOFF_BASE_SECONDS,
+                OUTBOX_BACKOFF_MAX_SECONDS,
+            )
+
+        # After commit. Reaches API workers only with LEAD_CACHE_NOTIFY.
+        await invalidate_leads(conn, list(person_ids))
+
+    if failed:
+        logger.warning("outbox batch: %d synced, %d failed", len(person_ids), len(failed))
+    return len(rows)
+
+
+# -------------------------------------------------
+# CHANGED-LEAD SCAN (own task)
+# -------------------------------------------------
+async def poll_changed_leads(pool, stop: asyncio.Event, interval: float = SYNC_CHANGES_INTERVAL_SECONDS):
+    while not stop.is_set():
+        try:
+            result = await sync_changed_leads(pool)
+            if result.get("synced_count") or result.get("failed_count"):
+                logger.info(
+                    "changed leads: %d synced, %d failed",
+                    result["synced_count"],
+                    result["failed_count"],
+                )
+        except Exception:
+            logger.exception("changed-lead sync failed")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+# -------------------------------------------------
+# MIRROR POLL (own task)
+# -------------------------------------------------
+async def poll_mirror(pool, stop: asyncio.Event, interval: float = MIRROR_POLL_SECONDS):
+    while not stop.is_set():
+        try:
+            await refresh_mirror(pool)
+        except Exception:
+            logger.exception("Twenty mirror refresh failed")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+# -------------------------------------------------
+# WORKER LOOP
+# -------------------------------------------------
+async def run_worker(stop: asyncio.Event):
+    pool = await init_pool()
+    wakeup = asyncio.Event()
+    listener = None
+    # Slow side jobs run beside the outbox loop so they never delay it.
+    side_tasks = []
+    if SYNC_CHANGES_INTERVAL_SECONDS > 0:
+        side_tasks.append(asyncio.create_task(poll_changed_leads(pool, stop)))
+    if MIRROR_POLL_SECONDS > 0:
+        side_tasks.append(asyncio.create_task(poll_mirror(pool, stop)))
+
+    def on_notify(*_):
+        wakeup.set()
+
+    try:
+        while not stop.is_set():
+            if listener is None or listener.is_closed():
+                try:
+                    listener = await get_db_connection()
+                    await listener.add_listener(OUTBOX_CHANNEL, on_notify)
+                except Exception:
+                    logger.exception("could not LISTEN on %s; polling only", OUTBOX_CHANNEL)
+                    listener = None
+
+            wakeup.clear()
+            try:
+                claimed = await process_outbox_batch(pool)
+            except Exception:
+                logger.exception("outbox batch failed")
+                claimed = 0
+
+            if claimed:
+                continue  # keep draining while there is work
+
+            # Idle: sleep until NOTIFY, shutdown, or the poll interval.
+            waiters = [
+                asyncio.ensure_future(wakeup.wait()),
+                asyncio.ensure_future(stop.wait()),
+            ]
+            await asyncio.wait(
+                waiters,
+                timeout=OUTBOX_POLL_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for w in waiters:
+                w.cancel()
+    finally:
+        for task in side_tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if listener is not None and not listener.is_closed():
+            await listener.close()
+        await twenty.aclose()
+        await close_pool()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    validate_config()
+
+    async def _main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await run_worker(stop)
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+# bench/api.py
+"""
+End-to-end API benchmark against local Twenty and Ollama stand-ins.
+
+    BENCH_DATABASE_URL=... python -m bench.seed --rows 100000
+    BENCH_DATABASE_URL=... python -m bench.api --leads 5000 --out run.json
+    python -m bench.compare baseline.json run.json
+
+Starts bench.fake_twenty, bench.fake_ollama and the API (uvicorn
+app.main:app) as subprocesses wired to each other and to the scratch
+database, resets the rows earlier runs touched, then drives:
+
+    post_leads   --leads POST /leads (a --dup-rate share are duplicates)
+    search       the bench.search query mix through GET /leads/search
+    sync_crm     POST /sync-crm over --sync-leads unsynced leads
+    auto_assign  POST /tasks/auto-assign over --people fake Twenty people,
+                 then once more with nothing left to assign (steady state)
+
+and prints throughput and p50/p95/p99 per scenario as JSON. Any other
+app setting (TWENTY_RATE_LIMIT_RPS, SYNC_CONCURRENCY, ...) is taken from
+the environment, so the same command compares configurations too.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import unquote, urlparse
+
+import httpx
+
+from bench.common import BENCH_DATABASE_URL, BENCH_DIR, connect, latency_summary, write_report
+from bench.search import make_queries
+from bench.seed import DOMAINS, FIRST, LAST
+
+APP_DIR = BENCH_DIR.parent
+LEAD_PREFIX = "BENCH-"
+
+
+# -------------------------------------------------
+# PROCESSES
+# -------------------------------------------------
+def _app_env(twenty_port: int, ollama_port: int) -> Dict[str, str]:
+    db = urlparse(BENCH_DATABASE_URL)
+    return {
+        **os.environ,
+        "DB_HOST": db.hostname or "localhost",
+        "DB_PORT": str(db.port or 5432),
+        "DB_NAME": db.path.lstrip("/"),
+        "DB_USER": unquote(db.username or ""),
+        "DB_PASSWORD": unquote(db.password or ""),
+        "TWENTY_REST_URL": f"http://127.0.0.1:{twenty_port}",
+        "TWENTY_REST_TOKEN": "bench",
+        "OLLAMA_URL": f"http://127.0.0.1:{ollama_port}/api/generate",
+        # Measure generation, not the note cache, unless asked otherwise.
+        "LLM_CACHE_ENABLED": os.getenv("LLM_CACHE_ENABLED", "false"),
+    }
+
+
+def _spawn(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", *args], cwd=APP_DIR, env=env)
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{proc.args} exited with {proc.returncode}")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+# -------------------------------------------------
+# DATABASE RESET (scratch database only)
+# -------------------------------------------------
+async def reset_database(sync_leads: int):
+    conn = await connect()
+    try:
+        await conn.execute("DELETE FROM crm_outbox WHERE lead_id LIKE $1", LEAD_PREFIX + "%")
+        await conn.execute("DELETE FROM leads WHERE lead_id LIKE $1", LEAD_PREFIX + "%")
+        # The fake Twenty starts empty every run: drop what was mirrored from it.
+        await conn.execute(
+            "TRUNCATE twenty_people, twenty_tasks, twenty_task_targets, twenty_mirror_state"
+        )
+        # Exactly `sync_leads` seeded leads (lowest ids) are left to sync.
+        await conn.execute("UPDATE leads SET crm_synced = TRUE WHERE NOT crm_synced")
+        await conn.execute(
+            """
+            UPDATE leads SET crm_synced = FALSE, crm_person_id = NULL
+            WHERE lead_id IN (
+                SELECT lead_id FROM leads WHERE email IS NOT NULL ORDER BY lead_id LIMIT $1
+            )
+            """,
+            sync_leads,
+        )
+        await conn.execute("ANALYZE leads")
+    finally:
+        await conn.close()
+
+
+# -------------------------------------------------
+# LOAD GENERATION
+# -------------------------------------------------
+def make_leads(n: int, dup_rate: float, rng: random.Random) -> List[Dict[str, Any]]:
+    leads: List[Dict[str, Any]] = []
+    for i in range(n):
+        if leads and rng.random() < dup_rate:
+            # Same person again under a new lead id: exercises the dedup path.
+            leads.append({**rng.choice(leads), "lead_id": f"{LEAD_PREFIX}{i:08d}"})
+            continue
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        leads.append({
+            "lead_id": f"{LEAD_PREFIX}{i:08d}",
+            "first_name": first.title(),
+            "last_name": last.title(),
+            "full_name": f"{first.title()} {last.title()}",
+            "email": f"{first}.{last}.bench{i}@{rng.choice(DOMAINS)}",
+            "phone": f"({rng.randint(200, 999)}) 7{i % 100:02d}-{rng.randrange(10000):04d}",
+            "city": "Toronto",
+            "country": "Canada",
+            "employment_status": "employed",
+            "job_title": rng.choice(["driver", "nurse", "engineer"]),
+            "monthly_salary_min": 4000,
+            "monthly_salary_max": 5500,
+            "current_credit": str(rng.randint(300, 900)),
+        })
+    return leads
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    calls: List[Callable[[], Any]],
+    concurrency: int,
+) -> Tuple[Dict[str, Any], List[httpx.Response]]:
+    """Run `calls` (each returns a request coroutine) `concurrency` at a time."""
+    samples: List[float] = []
+    responses: List[httpx.Response] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for call in calls:
+        queue.put_nowait(call)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            call = queue.get_nowait()
+            t0 = time.perf_counter()
+            try:
+                r = await call()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            samples.append(time.perf_counter() - t0)
+            responses.append(r)
+            if r.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    summary = latency_summary(samples, time.perf_counter() - started)
+    summary["errors"] = errors
+    return summary, responses
+
+
+# -------------------------------------------------
+# RUN
+# -------------------------------------------------
+async def run(args) -> Dict[str, Any]:
+    started_at = datetime.now(timezone.utc).isoformat()
+    await reset_database(args.sync_leads)
+
+    fake_env = dict(os.environ)
+    procs = [
+        _spawn([
+            "bench.fake_twenty",
+            "--port", str(args.twenty_port),
+            "--latency-ms", str(args.twenty_latency_ms),
+            "--jitter-ms", str(args.twenty_jitter_ms),
+            "--rate-429", str(args.rate_429),
+            "--members", str(args.members),
+            "--people", str(args.people),
+            "--seed", str(args.seed),
+        ], fake_env),
+        _spawn([
+            "bench.fake_ollama",
+            "--port", str(args.ollama_port),
+            "--latency-ms", str(args.ollama_latency_ms),
+            "--jitter-ms", str(args.ollama_jitter_ms),
+            "--seed", str(args.seed),
+        ], fake_env),
+        _spawn([
+            "uvicorn", "app.main:app",
+            "--port", str(args.api_port),
+            "--log-level", "warning",
+        ], _app_env(args.twenty_port, args.ollama_port)),
+    ]
+    twenty_url = f"http://127.0.0.1:{args.twenty_port}"
+    api_url = f"http://127.0.0.1:{args.api_port}"
+
+    try:
+        await _wait_ready(f"{twenty_url}/_stats", procs[0])
+        await _wait_ready(f"http://127.0.0.1:{args.ollama_port}/_stats", procs[1])
+        # /ready turns 200 once the API has warmed up (app/warmup.py).
+        await _wait_ready(f"{api_url}/ready", procs[2], timeout=120)
+
+        rng = random.Random(args.seed)
+        scenarios: Dict[str, Any] = {}
+        timeout = httpx.Timeout(args.request_timeout)
+        limits = httpx.Limits(max_connections=args.concurrency)
+
+        async with httpx.AsyncClient(base_url=api_url, timeout=timeout, limits=limits) as client:
+            leads = make_leads(args.leads, args.dup_rate, rng)
+            scenarios["post_leads"], _ = await drive(
+                client,
+                [lambda lead=lead: client.post("/leads", json=lead) for lead in leads],
+                args.concurrency,
+            )
+
+            queries = make_queries(args.queries, rng)
+            scenarios["search"], _ = await drive(
+                client,
+                [lambda p=params: client.get("/leads/search", params=p) for _, params in queries],
+                args.concurrency,
+            )
+
+            # Also syncs the BENCH- leads posted above, so the fake Twenty
+            # has people for auto-assign beyond --people.
+            summary, responses = await drive(client, [lambda: client.post("/sync-crm")], 1)
+            body = responses[0].json() if responses and responses[0].is_success else {}
+            summary["leads_synced"] = body.get("synced_count", 0)
+            summary["leads_failed"] = body.get("failed_count", 0)
+            if summary.get("elapsed_s"):
+                summary["leads_per_s"] = round(summary["leads_synced"] / summary["elapsed_s"], 2)
+            scenarios["sync_crm"] = summary
+
+            for name in ("auto_assign", "auto_assign_steady"):
+                summary, responses = await drive(client, [lambda: client.post("/tasks/auto-assign")], 1)
+                body = responses[0].json() if responses and responses[0].is_success else {}
+                summary["tasks_created"] = body.get("tasks_created", 0)
+                summary["tasks_failed"] = body.get("tasks_failed", 0)
+                if summary.get("elapsed_s"):
+                    summary["tasks_per_s"] = round(summary["tasks_created"] / summary["elapsed_s"], 2)
+                scenarios[name] = summary
+
+            twenty_stats = (await client.get(f"{twenty_url}/_stats")).json()
+            ollama_stats = (await client.get(f"http://127.0.0.1:{args.ollama_port}/_stats")).json()
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    return {
+        "benchmark": "api",
+        "started_at": started_at,
+        "git_commit": _git_commit(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "scenarios": scenarios,
+        "fake_twenty": twenty_stats,
+        "fake_ollama": ollama_stats,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=APP_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--leads", type=int, default=2000)
+    parser.add_argument("--dup-rate", type=float, default=0.1)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--sync-leads", type=int, default=1000)
+    parser.add_argument("--people", type=int, default=200)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--twenty-latency-ms", type=float, default=40)
+    parser.add_argument("--twenty-jitter-ms", type=float, default=10)
+    parser.add_argument("--rate-429", type=float, default=0.02)
+    parser.add_argument("--ollama-latency-ms", type=float, default=300)
+    parser.add_argument("--ollama-jitter-ms", type=float, default=50)
+    parser.add_argument("--request-timeout", type=float, default=600)
+    parser.add_argument("--api-port", type=int, default=8700)
+    parser.add_argument("--twenty-port", type=int, default=8701)
+    parser.add_argument("--ollama-port", type=int, default=8702)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+    write_report(asyncio.run(run(args)), args.out)
+
+
+if __name__ == "__main__":
+    main()
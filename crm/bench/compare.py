@@ -0,0 +1,81 @@
+# bench/compare.py
+"""
+Compare two benchmark reports (bench.api, bench.search, ...).
+
+    python -m bench.compare baseline.json candidate.json --threshold 10
+
+Every latency summary found in both reports (any object with p50_ms) is
+lined up by its path, e.g. `scenarios.sync_crm`. Prints throughput and
+p50/p95/p99 with the relative change, and exits 1 if any of them got
+worse by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+# metric -> True if larger is better
+METRICS = {
+    "throughput_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def summaries(report: Any, path: str = "") -> Iterator[Tuple[str, Dict[str, Any]]]:
+    if isinstance(report, dict):
+        if "p50_ms" in report:
+            yield path or "(root)", report
+            return
+        for key, value in report.items():
+            yield from summaries(value, f"{path}.{key}" if path else key)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float):
+    base = dict(summaries(baseline))
+    rows, regressions = [], []
+
+    for path, cand in summaries(candidate):
+        old = base.get(path)
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            a, b = old.get(metric), cand.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a * 100
+            worse = -change if higher_is_better else change
+            rows.append((path, metric, a, b, change))
+            if worse > threshold:
+                regressions.append((path, metric, change))
+
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    rows, regressions = compare(baseline, candidate, args.threshold)
+
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'summary':<{width}}  {'metric':<16} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for path, metric, a, b, change in rows:
+        print(f"{path:<{width}}  {metric:<16} {a:>12.3f} {b:>12.3f} {change:>+8.1f}%")
+
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold}%:")
+        for path, metric, change in regressions:
+            print(f"  {path} {metric} {change:+.1f}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# bench/fake_ollama.py
+"""
+Stand-in for Ollama's POST /api/generate, for benchmarks only.
+
+    python -m bench.fake_ollama --port 8702 --latency-ms 1500
+
+Answers every prompt with deterministic markdown after `latency`
+(+/- jitter); a seeded share of calls fails with 500 so the circuit
+breaker and fallback path are exercised too.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def _note(prompt: str) -> str:
+    tag = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    return (
+        f"## 🚗 Your next car is closer than you think ({tag})\n\n"
+        "Thanks for reaching out! Based on your profile we can **pre-qualify** "
+        "you today, with options that fit your budget.\n\n"
+        "### ✅ Next steps\n"
+        "- [ ] Confirm your preferred vehicle type\n"
+        "- [ ] Book a 10-minute call\n"
+        "- [ ] Upload proof of income\n"
+    )
+
+
+def create_app(latency_ms: float = 0, jitter_ms: float = 0, fail_rate: float = 0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="fake-ollama")
+    rng = random.Random(seed)
+    served = {"ok": 0, "failed": 0, "load": 0}
+
+    @app.get("/_stats")
+    async def stats():
+        return {"served": served}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        if not body.get("prompt"):
+            # Model preload (app/llm.py preload_model): nothing to generate.
+            served["load"] += 1
+            return {"model": body.get("model"), "response": "", "done": True, "done_reason": "load"}
+
+        delay = max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000 if latency_ms else 0
+        if delay:
+            await asyncio.sleep(delay)
+
+        if fail_rate and rng.random() < fail_rate:
+            served["failed"] += 1
+            return JSONResponse({"error": "model overloaded"}, status_code=500)
+
+        served["ok"] += 1
+        return {
+            "model": body.get("model"),
+            "response": _note(body.get("prompt", "")),
+            "done": True,
+        }
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8702)
+    parser.add_argument("--latency-ms", type=float, default=1500)
+    parser.add_argument("--jitter-ms", type=float, default=300)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.fail_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
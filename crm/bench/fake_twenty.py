@@ -0,0 +1,246 @@
+# bench/fake_twenty.py
+"""
+In-memory stand-in for the Twenty REST API, for benchmarks only.
+
+    python -m bench.fake_twenty --port 8701 --latency-ms 40 --rate-429 0.02
+
+Serves the endpoints app/crm.py and app/mirror.py use (people upsert,
+batch upsert, filter and PATCH; tasks; taskTargets; workspaceMembers)
+with cursor pagination. Every response waits `latency` (+/- jitter) and
+a seeded share of them is answered 429 with Retry-After, so retry and
+rate-limit behaviour is exercised. GET /_stats reports what was served.
+"""
+import argparse
+import asyncio
+import random
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+_FILTER = re.compile(r'([\w.]+)\[(\w+)\]:"?([^",]*)"?')
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _field(record: Dict[str, Any], path: str) -> Any:
+    value: Any = record
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _matches(record: Dict[str, Any], field: str, op: str, value: str) -> bool:
+    actual = _field(record, field)
+    if actual is None:
+        return False
+    actual = str(actual)
+    if field.endswith("primaryEmail"):
+        actual, value = actual.lower(), value.lower()
+    if field.endswith("At") and op in ("gte", "lte"):
+        actual, value = _parse_ts(actual), _parse_ts(value)
+    if op == "eq":
+        return actual == value
+    if op == "gte":
+        return actual >= value
+    if op == "lte":
+        return actual <= value
+    if op == "in":
+        return actual in value.strip("[]").split(",")
+    return False
+
+
+class FakeTwenty:
+    """The data store; ids are deterministic for a given seed."""
+
+    def __init__(self, seed: int, members: int, people: int):
+        self._ids = random.Random(seed)
+        self.objects: Dict[str, Dict[str, Dict[str, Any]]] = {
+            "people": {},
+            "tasks": {},
+            "taskTargets": {},
+            "workspaceMembers": {},
+        }
+        self.person_by_email: Dict[str, str] = {}
+
+        for n in range(members):
+            self.create("workspaceMembers", {
+                "name": {"firstName": "Agent", "lastName": f"{n:03d}"},
+                "userEmail": f"agent{n:03d}@bench.local",
+            })
+        for n in range(people):
+            self.upsert_person({
+                "name": {"firstName": "Bench", "lastName": f"Person{n:06d}"},
+                "emails": {"primaryEmail": f"bench.person{n:06d}@bench.local"},
+            })
+
+    def _new_id(self) -> str:
+        return str(uuid.UUID(int=self._ids.getrandbits(128), version=4))
+
+    def create(self, object_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = _now()
+        record = {**data, "id": self._new_id(), "createdAt": now, "updatedAt": now, "deletedAt": None}
+        self.objects[object_name][record["id"]] = record
+        return record
+
+    def update(self, object_name: str, record_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        record = self.objects[object_name].get(record_id)
+        if record is None:
+            return None
+        record.update({k: v for k, v in data.items() if k != "id"})
+        record["updatedAt"] = _now()
+        return record
+
+    def upsert_person(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        email = (_field(data, "emails.primaryEmail") or "").lower()
+        person_id = self.person_by_email.get(email)
+        if person_id is not None:
+            return self.update("people", person_id, data)
+        record = self.create("people", data)
+        if email:
+            self.person_by_email[email] = record["id"]
+        return record
+
+    def list(self, object_name: str, params) -> Dict[str, Any]:
+        records: List[Dict[str, Any]] = list(self.objects[object_name].values())
+
+        for key, value in params.items():
+            if key.startswith("filter[") and key.endswith("]"):
+                records = [r for r in records if _matches(r, key[7:-1], "eq", value)]
+        for field, op, value in _FILTER.findall(params.get("filter", "")):
+            records = [r for r in records if _matches(r, field, op, value)]
+        if params.get("order_by", "").startswith("updatedAt"):
+            records.sort(key=lambda r: r["updatedAt"])
+
+        start = 0
+        if params.get("starting_after"):
+            start = int(params["starting_after"]) + 1
+        limit = int(params.get("limit", 60))
+        page = records[start:start + limit]
+        end = start + len(page)
+
+        return {
+            "data": {object_name: page},
+            "pageInfo": {
+                "hasNextPage": end < len(records),
+                "startCursor": str(start),
+                "endCursor": str(end - 1) if page else None,
+            },
+            "totalCount": len(records),
+        }
+
+
+def create_app(
+    store: FakeTwenty,
+    latency_ms: float = 0,
+    jitter_ms: float = 0,
+    rate_429: float = 0,
+    retry_after: float = 1,
+    seed: int = 0,
+) -> FastAPI:
+    app = FastAPI(title="fake-twenty")
+    rng = random.Random(seed)
+    served: Counter = Counter()
+
+    @app.middleware("http")
+    async def inject(request: Request, call_next):
+        if request.url.path == "/_stats":
+            return await call_next(request)
+
+        delay = max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000 if latency_ms else 0
+        if delay:
+            await asyncio.sleep(delay)
+
+        route = f"{request.method} {request.url.path.split('/')[1]}"
+        if rate_429 and rng.random() < rate_429:
+            served[f"{route} 429"] += 1
+            return JSONResponse(
+                {"error": "Too Many Requests"},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        response = await call_next(request)
+        served[f"{route} {response.status_code}"] += 1
+        return response
+
+    @app.get("/_stats")
+    async def stats():
+        return {
+            "served": dict(sorted(served.items())),
+            "objects": {name: len(records) for name, records in store.objects.items()},
+        }
+
+    # ---- people ----
+    @app.post("/people")
+    async def create_person(request: Request):
+        return {"data": {"createPerson": store.upsert_person(await request.json())}}
+
+    @app.post("/batch/people")
+    async def create_people(request: Request):
+        return {"data": {"createPeople": [store.upsert_person(p) for p in await request.json()]}}
+
+    @app.patch("/people/{person_id}")
+    async def update_person(person_id: str, request: Request):
+        record = store.update("people", person_id, await request.json())
+        if record is None:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        return {"data": {"updatePerson": record}}
+
+    # ---- tasks / taskTargets ----
+    @app.post("/tasks")
+    async def create_task(request: Request):
+        return store.create("tasks", await request.json())
+
+    @app.delete("/tasks/{task_id}")
+    async def delete_task(task_id: str):
+        if store.objects["tasks"].pop(task_id, None) is None:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        return {"data": {"deleteTask": {"id": task_id}}}
+
+    @app.post("/taskTargets")
+    async def create_task_target(request: Request):
+        return {"data": {"createTaskTarget": store.create("taskTargets", await request.json())}}
+
+    # ---- lists ----
+    @app.get("/{object_name}")
+    async def list_records(object_name: str, request: Request):
+        if object_name not in store.objects:
+            return JSONResponse({"error": "Unknown object"}, status_code=404)
+        return store.list(object_name, request.query_params)
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8701)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--people", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    store = FakeTwenty(args.seed, args.members, args.people)
+    app = create_app(store, args.latency_ms, args.jitter_ms, args.rate_429, args.retry_after, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
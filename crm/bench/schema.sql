@@ -0,0 +1,23 @@
+-- Minimal `leads` table for a SCRATCH benchmark database.
+-- Mirrors the columns the app reads and writes; never run against prod.
+
+CREATE TABLE IF NOT EXISTS leads (
+    lead_id            TEXT PRIMARY KEY,
+    first_name         TEXT,
+    last_name          TEXT,
+    full_name          TEXT,
+    email              TEXT,
+    phone              TEXT,
+    city               TEXT,
+    country            TEXT,
+    employment_status  TEXT,
+    job_title          TEXT,
+    monthly_salary_min NUMERIC,
+    monthly_salary_max NUMERIC,
+    current_credit     TEXT,
+    crm_synced         BOOLEAN NOT NULL DEFAULT FALSE,
+    crm_person_id      TEXT,
+    task_created       BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at         TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at         TIMESTAMPTZ NOT NULL DEFAULT now()
+);
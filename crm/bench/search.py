@@ -0,0 +1,80 @@
+# bench/search.py
+"""
+Latency benchmark for app.models.search_leads against a seeded database.
+
+    BENCH_DATABASE_URL=... python -m bench.search --queries 2000 --concurrency 8
+
+Runs a fixed, seeded mix of phone / email / name queries (exact
+substrings and typos) and prints throughput and p50/p95/p99 as JSON.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.models import search_leads
+from bench.common import create_pool, latency_summary, write_report
+from bench.seed import FIRST, LAST
+
+
+def make_queries(n: int, rng: random.Random):
+    def typo(word: str) -> str:
+        i = rng.randrange(len(word))
+        return word[:i] + word[i + 1:]  # drop one letter
+
+    kinds = []
+    for _ in range(n):
+        kind = rng.choice(["phone", "email", "name", "name_typo", "email_typo"])
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        if kind == "phone":
+            kinds.append((kind, {"phone": f"555-{rng.randrange(10000):04d}"}))
+        elif kind == "email":
+            kinds.append((kind, {"email": f"{first}.{last}{rng.randrange(100000)}"}))
+        elif kind == "email_typo":
+            kinds.append((kind, {"email": f"{typo(first)}.{last}{rng.randrange(100000)}"}))
+        elif kind == "name":
+            kinds.append((kind, {"name": f"{first} {last}"}))
+        else:
+            kinds.append((kind, {"name": f"{typo(first)} {last}"}))
+    return kinds
+
+
+async def run(queries: int, concurrency: int, seed_value: int):
+    pool = await create_pool(concurrency)
+    work = make_queries(queries, random.Random(seed_value))
+    samples = {}
+    rows = await pool.fetchval("SELECT count(*) FROM leads")
+
+    async def worker(items):
+        async with pool.acquire() as conn:
+            for kind, params in items:
+                t0 = time.perf_counter()
+                await search_leads(conn, **params)
+                samples.setdefault(kind, []).append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(work[i::concurrency]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await pool.close()
+
+    return {
+        "benchmark": "search_leads",
+        "rows": rows,
+        "concurrency": concurrency,
+        "all": latency_summary([x for v in samples.values() for x in v], elapsed),
+        "by_kind": {k: latency_summary(v, elapsed) for k, v in sorted(samples.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+    write_report(asyncio.run(run(args.queries, args.concurrency, args.seed)), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+-- 001: durable outbox feeding the background CRM sync worker (app/worker.py)
+
+CREATE TABLE IF NOT EXISTS crm_outbox (
+    id              BIGSERIAL PRIMARY KEY,
+    lead_id         TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending',  -- pending | done | dead
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_error      TEXT,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    processed_at    TIMESTAMPTZ
+);
+
+-- Workers only ever scan the pending, due rows.
+CREATE INDEX IF NOT EXISTS crm_outbox_pending_idx
+    ON crm_outbox (next_attempt_at, id)
+    WHERE status = 'pending';
+
+-- Leads created before the outbox existed.
+INSERT INTO crm_outbox (lead_id)
+SELECT l.lead_id
+FROM leads l
+WHERE l.crm_synced = FALSE
+  AND NOT EXISTS (SELECT 1 FROM crm_outbox o WHERE o.lead_id = l.lead_id);
@@ -0,0 +1,4 @@
+-- 002: supports keyset pagination of GET /leads (newest first)
+
+CREATE INDEX IF NOT EXISTS leads_created_at_lead_id_idx
+    ON leads (created_at DESC, lead_id DESC);
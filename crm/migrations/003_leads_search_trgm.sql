@@ -0,0 +1,18 @@
+-- 003: trigram indexes behind GET /leads/search (substring + fuzzy matching)
+--
+-- The expressions must stay identical to the ones in app/models.py
+-- (SEARCH_*_EXPR) or the planner cannot use these indexes.
+-- Run outside a transaction block (CONCURRENTLY), e.g. plain `psql -f`.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS leads_search_email_trgm_idx
+    ON leads USING gin (lower(email) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS leads_search_name_trgm_idx
+    ON leads USING gin (
+        lower(coalesce(first_name, '') || ' ' || coalesce(last_name, '')) gin_trgm_ops
+    );
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS leads_search_phone_trgm_idx
+    ON leads USING gin (regexp_replace(phone, '\D', '', 'g') gin_trgm_ops);
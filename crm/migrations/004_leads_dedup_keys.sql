@@ -0,0 +1,45 @@
+-- 004: normalized dedup keys + unique indexes for race-free POST /leads
+--
+-- Rules match app/normalize.py:
+--   email_norm = trimmed, lower-cased email
+--   phone_norm = last 10 digits, NULL if fewer than 10 digits
+
+ALTER TABLE leads ADD COLUMN IF NOT EXISTS email_norm TEXT;
+ALTER TABLE leads ADD COLUMN IF NOT EXISTS phone_norm TEXT;
+
+UPDATE leads
+SET
+    email_norm = nullif(lower(btrim(email)), ''),
+    phone_norm = CASE
+        WHEN length(regexp_replace(phone, '\D', '', 'g')) >= 10
+        THEN right(regexp_replace(phone, '\D', '', 'g'), 10)
+    END
+WHERE email_norm IS NULL AND phone_norm IS NULL;
+
+-- Duplicates that already exist keep their key only on the oldest row;
+-- newer copies stay in the table but no longer claim the key.
+WITH ranked AS (
+    SELECT lead_id,
+           row_number() OVER (PARTITION BY email_norm ORDER BY created_at, lead_id) AS rn
+    FROM leads
+    WHERE email_norm IS NOT NULL
+)
+UPDATE leads l SET email_norm = NULL
+FROM ranked r
+WHERE l.lead_id = r.lead_id AND r.rn > 1;
+
+WITH ranked AS (
+    SELECT lead_id,
+           row_number() OVER (PARTITION BY phone_norm ORDER BY created_at, lead_id) AS rn
+    FROM leads
+    WHERE phone_norm IS NOT NULL
+)
+UPDATE leads l SET phone_norm = NULL
+FROM ranked r
+WHERE l.lead_id = r.lead_id AND r.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS leads_email_norm_key
+    ON leads (email_norm) WHERE email_norm IS NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS leads_phone_norm_key
+    ON leads (phone_norm) WHERE phone_norm IS NOT NULL;
@@ -0,0 +1,17 @@
+-- 005: near-duplicate lead pairs found by the nightly linkage job (app/linkage.py)
+
+CREATE TABLE IF NOT EXISTS lead_merge_suggestions (
+    lead_id_a   TEXT NOT NULL,
+    lead_id_b   TEXT NOT NULL,
+    score       REAL NOT NULL,
+    reasons     TEXT[] NOT NULL,                -- blocking keys the pair shared
+    status      TEXT NOT NULL DEFAULT 'open',   -- open | merged | dismissed
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (lead_id_a, lead_id_b),
+    CHECK (lead_id_a < lead_id_b)
+);
+
+CREATE INDEX IF NOT EXISTS lead_merge_suggestions_open_idx
+    ON lead_merge_suggestions (score DESC)
+    WHERE status = 'open';
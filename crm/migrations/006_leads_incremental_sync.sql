@@ -0,0 +1,37 @@
+-- 006: incremental CRM sync (POST /sync-crm/changes, app.worker)
+--
+-- crm_payload_hash = SHA-256 of the Twenty person payload last sent for the
+-- lead (app/crm.person_payload_hash); crm_sync_state holds the updated_at
+-- watermark of the last completed change scan.
+-- Run outside a transaction block (CONCURRENTLY), e.g. plain `psql -f`.
+
+ALTER TABLE leads ADD COLUMN IF NOT EXISTS crm_payload_hash TEXT;
+
+CREATE TABLE IF NOT EXISTS crm_sync_state (
+    name       TEXT PRIMARY KEY,
+    watermark  TIMESTAMPTZ NOT NULL
+);
+
+-- Start from "now": edits made before this migration were never tracked.
+INSERT INTO crm_sync_state (name, watermark)
+VALUES ('leads_changes', now())
+ON CONFLICT (name) DO NOTHING;
+
+-- Any UPDATE that does not set updated_at itself still moves it, so edits
+-- made outside this service are picked up by the watermark scan.
+CREATE OR REPLACE FUNCTION leads_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+        NEW.updated_at := now();
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS leads_touch_updated_at ON leads;
+CREATE TRIGGER leads_touch_updated_at
+    BEFORE UPDATE ON leads
+    FOR EACH ROW EXECUTE FUNCTION leads_touch_updated_at();
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS leads_synced_updated_at_idx
+    ON leads (updated_at, lead_id) WHERE crm_synced;
@@ -0,0 +1,49 @@
+-- 007: local mirror of Twenty people, tasks and taskTargets (app/mirror.py)
+--
+-- Kept current by a full load, incremental updatedAt polls and webhook
+-- deltas. Rows deleted in Twenty keep their id with deleted_at set.
+-- Only people keep the full record (`data`): it feeds the LLM note.
+
+CREATE TABLE IF NOT EXISTS twenty_people (
+    id           TEXT PRIMARY KEY,
+    first_name   TEXT,
+    last_name    TEXT,
+    email        TEXT,
+    data         JSONB NOT NULL,
+    updated_at   TIMESTAMPTZ,
+    deleted_at   TIMESTAMPTZ,
+    mirrored_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS twenty_tasks (
+    id           TEXT PRIMARY KEY,
+    title        TEXT,
+    status       TEXT,
+    assignee_id  TEXT,
+    updated_at   TIMESTAMPTZ,
+    deleted_at   TIMESTAMPTZ,
+    mirrored_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS twenty_task_targets (
+    id           TEXT PRIMARY KEY,
+    task_id      TEXT,
+    person_id    TEXT,
+    updated_at   TIMESTAMPTZ,
+    deleted_at   TIMESTAMPTZ,
+    mirrored_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS twenty_mirror_state (
+    object_name   TEXT PRIMARY KEY,
+    watermark     TIMESTAMPTZ,
+    full_load_at  TIMESTAMPTZ
+);
+
+-- Eligibility anti-join: person -> live targets -> open task (by PK)
+CREATE INDEX IF NOT EXISTS twenty_task_targets_person_idx
+    ON twenty_task_targets (person_id, task_id) WHERE deleted_at IS NULL;
+
+-- Open-task counts per member (MemberLoadLedger)
+CREATE INDEX IF NOT EXISTS twenty_tasks_open_assignee_idx
+    ON twenty_tasks (assignee_id) WHERE status = 'TODO' AND deleted_at IS NULL;
@@ -0,0 +1,19 @@
+-- 008: per-lead failures of the incremental CRM sync (app/sync.sync_changed_leads)
+--
+-- A lead whose push to Twenty failed is retried from here with backoff
+-- instead of holding the crm_sync_state watermark back; after
+-- SYNC_CHANGES_MAX_ATTEMPTS it goes 'dead' until the lead is edited again.
+
+CREATE TABLE IF NOT EXISTS crm_sync_failures (
+    lead_id         TEXT PRIMARY KEY,
+    lead_updated_at TIMESTAMPTZ NOT NULL,  -- the edit that failed
+    status          TEXT NOT NULL DEFAULT 'retry',  -- retry | dead
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_error      TEXT,
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS crm_sync_failures_retry_idx
+    ON crm_sync_failures (next_attempt_at)
+    WHERE status = 'retry';
@@ -0,0 +1,13 @@
+-- 009: lease-based outbox claims (app/worker.py)
+--
+-- A worker claims rows by setting status = 'in_progress' and a lease
+-- (locked_until) in one short statement, calls Twenty with no transaction
+-- open, then records the outcome. Rows whose lease ran out (the worker
+-- died mid-batch) are put back to 'pending' by the next claim.
+
+ALTER TABLE crm_outbox ADD COLUMN IF NOT EXISTS locked_until TIMESTAMPTZ;
+
+-- status is now pending | in_progress | done | dead
+CREATE INDEX IF NOT EXISTS crm_outbox_in_progress_idx
+    ON crm_outbox (locked_until)
+    WHERE status = 'in_progress';
@@ -1,4 +1,10 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any, Optional
 from config import TWENTY_REST_URL, TWENTY_REST_TOKEN
 
@@ -13,6 +19,84 @@ HEADERS = {
     "Prefer": "resolution=merge-duplicates,return=representation",
 }
 
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class TwentyClient:
+    """Keep-alive session for Twenty with jittered exponential backoff."""
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout=(3, 10),
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        pool_size: int = 10,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        url = f"{self.base_url}{path}"
+
+        attempt = 0
+        while True:
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if r.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return r
+                delay = _parse_retry_after(r.headers.get("Retry-After"))
+                if delay is None:
+                    delay = self._backoff(attempt)
+
+            time.sleep(min(delay, self.backoff_max))
+            attempt += 1
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+twenty = TwentyClient(TWENTY_REST_URL, HEADERS)
+
 
 def _normalize_phone(phone: Optional[str]) -> Optional[str]:
     if not phone:
@@ -76,11 +160,10 @@ def upsert_person_in_crm(lead: Dict[str, Any]) -> str:
     # --------------------
     # UPSERT TO TWENTY
     # --------------------
-    r = requests.post(
-        f"{TWENTY_REST_URL}/people?upsert=true",
-        headers=HEADERS,
+    r = twenty.post(
+        "/people",
+        params={"upsert": "true"},
         json=payload,
-        timeout=(3, 10),
     )
 
     if not r.ok: